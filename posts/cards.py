@@ -0,0 +1,90 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import thumbnails
+
+# Карточка поста кэшируется без данных о зрителе: на месте подписи
+# кнопки комментариев и кнопки редактирования остаются метки, которые
+# заменяются при выводе страницы.
+LABEL_MARK = '<!--card:label-->'
+EDIT_MARK = '<!--card:edit-->'
+MARKS = {'label': mark_safe(LABEL_MARK), 'edit': mark_safe(EDIT_MARK)}
+
+AUTHORIZED_LABEL = 'Добавить комментарий'
+ANONYMOUS_LABEL = 'Комментарии'
+
+
+def card_version(post):
+    """Версия карточки меняется вместе с любыми выводимыми в ней данными:
+    текстом и картинкой после правки, заглушкой и готовыми миниатюрами,
+    числом комментариев, названием группы после переименования.
+    """
+    group = post.group
+    parts = (
+        post.text,
+        str(post.image or ''),
+        post.image_placeholder,
+        *thumbnails.ready(post),
+        post.author.username,
+        group.slug if group else '',
+        group.title if group else '',
+        str(post.comment_count),
+        post.pub_date.isoformat(),
+    )
+    return hashlib.md5('\x00'.join(parts).encode()).hexdigest()
+
+
+def card_key(post):
+    return f'card:{post.id}:{card_version(post)}'
+
+
+def render_card(post):
+    return (
+        render_to_string('post_item.html', {'post': post, 'fragment': MARKS}),
+        render_to_string('post_edit_button.html', {'post': post}),
+    )
+
+
+def iter_cards(posts, user):
+    """Карточки страницы ленты по одной, как их выводит render_cards.
+
+    Кэш карточек и миниатюры читаются сразу при вызове, одним get_many
+    и одним запросом к KVStore. Недостающие карточки рендерятся по мере
+    перебора и сохраняются одним set_many в конце.
+    """
+    posts = list(posts)
+    thumbnails.prefetch(posts)
+    keys = [card_key(post) for post in posts]
+    cached = cache.get_many(keys)
+    label = AUTHORIZED_LABEL if user.is_authenticated else ANONYMOUS_LABEL
+    return _cards(posts, keys, cached, label, user)
+
+
+def _cards(posts, keys, cached, label, user):
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key in cached:
+            html, edit = cached[key]
+        else:
+            html, edit = missing[key] = render_card(post)
+        if user.id != post.author_id:
+            edit = ''
+        yield mark_safe(
+            html.replace(LABEL_MARK, label).replace(EDIT_MARK, edit)
+        )
+    if missing:
+        cache.set_many(missing, settings.CARD_CACHE_TIMEOUT)
+
+
+def render_cards(posts, user):
+    """Возвращает HTML карточек для страницы ленты.
+
+    Все карточки страницы читаются из кэша одним get_many, недостающие
+    рендерятся и сохраняются одним set_many. Миниатюры картинок
+    страницы тоже находятся одним запросом.
+    """
+    return list(iter_cards(posts, user))
@@ -0,0 +1,58 @@
+import hashlib
+
+from django.db.models import F
+
+from .models import Counter
+
+POSTS = 'posts'
+
+
+def group_key(group_id):
+    return f'posts:group:{group_id}'
+
+
+def timeline_key(user_id):
+    return f'timeline:{user_id}'
+
+
+def image_key(name):
+    # имя файла может не поместиться в Counter.name
+    return f'image:{hashlib.sha1(name.encode()).hexdigest()}'
+
+
+def post_keys(post):
+    keys = [POSTS]
+    if post.group_id is not None:
+        keys.append(group_key(post.group_id))
+    return keys
+
+
+def increment(names, delta=1):
+    """Сдвигает существующие счётчики на delta.
+
+    Отсутствующие счётчики не создаются: их создаёт reconcile_counters,
+    а до этого чтение считает точный COUNT.
+    """
+    if names:
+        Counter.objects.filter(name__in=names).update(
+            value=F('value') + delta,
+        )
+
+
+def invalidate(names):
+    Counter.objects.filter(name__in=names).delete()
+
+
+def get_count(name, queryset):
+    """Возвращает значение счётчика, при его отсутствии — точный COUNT.
+
+    Чтение ничего не записывает: счётчик, созданный между COUNT
+    и вставкой, потерял бы параллельные increment.
+    """
+    value = Counter.objects.filter(name=name).values_list(
+        'value',
+        flat=True,
+    ).first()
+    if value is None:
+        value = queryset.count()
+    return value
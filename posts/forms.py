@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from . import images, thumbnails
 from .models import Comment, Post
 
 
@@ -8,6 +10,42 @@ class PostForm(ModelForm):
         model = Post
         fields = ('text', 'group', 'image',)
 
+    image_size = (None, None)
+    image_placeholder = ''
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            image, self.image_size, self.image_placeholder = (
+                images.normalize(image)
+            )
+        return image
+
+    def save_image(self):
+        """Записывает загруженную картинку в хранилище до сохранения
+        поста.
+
+        View вызывает его вне транзакции: хэширование и запись файла
+        не держат блокировку записи базы. Файл без поста, если
+        сохранение не удастся, соберёт gc_images.
+        """
+        image = self.instance.image
+        if 'image' in self.changed_data and image and not image._committed:
+            image.save(image.name, image.file, save=False)
+
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            self.instance.image_width, self.instance.image_height = (
+                self.image_size
+            )
+            self.instance.image_placeholder = self.image_placeholder
+        post = super().save(commit)
+        # миниатюры новой картинки создаются в фоне, а не при первом
+        # показе ленты
+        if 'image' in self.changed_data and post.image:
+            thumbnails.schedule(post.image)
+        return post
+
 
 class CommentsForm(ModelForm):
     class Meta:
@@ -0,0 +1,81 @@
+import base64
+import io
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .thumbnails import card_size
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def placeholder(image):
+    """Крошечная копия картинки в кадре карточки шириной
+    IMAGE_PLACEHOLDER_WIDTH в виде data URI JPEG. Карточка растягивает
+    её на своё место, пока не загрузится миниатюра.
+    """
+    width, height = card_size()
+    size = (
+        settings.IMAGE_PLACEHOLDER_WIDTH,
+        max(round(settings.IMAGE_PLACEHOLDER_WIDTH * height / width), 1),
+    )
+    image = ImageOps.fit(image.convert('RGB'), size, Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=settings.IMAGE_PLACEHOLDER_QUALITY)
+    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def normalize(upload):
+    """Приводит загруженную картинку к виду для хранения.
+
+    Картинка читается из файла загрузки, крупные JPEG декодируются
+    сразу в уменьшенном масштабе. Ориентация из EXIF применяется
+    к пикселям, после чего метаданные отбрасываются, стороны
+    ограничиваются UPLOAD_IMAGE_MAX_SIZE. Картинки с прозрачностью
+    сохраняются в PNG, остальные в JPEG с качеством
+    UPLOAD_IMAGE_QUALITY.
+
+    Возвращает ContentFile, размеры картинки и заглушку placeholder().
+    Картинку, которую не удалось декодировать, отклоняет
+    ValidationError.
+    """
+    limit = settings.UPLOAD_IMAGE_MAX_SIZE
+    upload.seek(0)
+    buffer = io.BytesIO()
+    try:
+        image = Image.open(upload)
+        image.draft('RGB', (limit, limit))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        if has_alpha(image):
+            image.convert('RGBA').save(buffer, 'PNG', optimize=True)
+            extension = 'png'
+        else:
+            image.convert('RGB').save(
+                buffer,
+                'JPEG',
+                quality=settings.UPLOAD_IMAGE_QUALITY,
+                optimize=True,
+                progressive=True,
+            )
+            extension = 'jpg'
+    except (Image.DecompressionBombError, OSError, ValueError,
+            SyntaxError, EOFError) as error:
+        # проверка ImageField не декодирует пиксели, поэтому усечённые
+        # и слишком большие картинки обнаруживаются только здесь
+        raise ValidationError(
+            'Не удалось обработать картинку: файл повреждён '
+            'или слишком велик',
+            code='invalid_image',
+        ) from error
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    content = ContentFile(buffer.getvalue(), name=f'{stem}.{extension}')
+    return content, image.size, placeholder(image)
@@ -0,0 +1,232 @@
+import json
+import math
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from posts import urls
+from posts.models import Comment, Follow, Post, User, UserStats
+from posts.performance import capture_requests
+
+# маршруты, доступные без входа, замеряются ещё и для анонима
+ANONYMOUS_ROUTES = ('index', 'group', 'profile', 'post')
+# маршруты, которые открывает только автор поста
+AUTHOR_ROUTES = ('post_edit',)
+POST_DATA = {
+    'add_comment': {'text': 'Комментарий из бенчмарка'},
+}
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет все маршруты posts/urls.py через тестовый Client '
+            'и выводит p50/p95/p99, число SQL-запросов и пропускную '
+            'способность. Комментарии и подписки, созданные замером, '
+            'удаляются после него')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--output',
+            help='Записать результаты в JSON как новый baseline',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Сравнить результаты с сохранённым baseline',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Допустимый рост p95 относительно baseline',
+        )
+
+    def sample(self):
+        reader_stats = UserStats.objects.order_by('-following').first()
+        if reader_stats is None:
+            raise CommandError('Нет данных, запустите generate_data')
+        post = Post.objects.filter(group__isnull=False).select_related(
+            'author',
+            'group',
+        ).first()
+        if post is None:
+            raise CommandError('Нет постов в группах')
+        return User.objects.get(pk=reader_stats.user_id), post
+
+    def routes(self, reader, post):
+        clients = {
+            'reader': Client(),
+            'author': Client(),
+            'anonymous': Client(),
+        }
+        clients['reader'].force_login(reader)
+        clients['author'].force_login(post.author)
+        values = {
+            'username': post.author.username,
+            'post_id': post.id,
+            'slug': post.group.slug,
+        }
+        routes = []
+        # безымянные маршруты служебные и перекрыты профилем
+        for pattern in urls.urlpatterns:
+            name = pattern.name
+            if name is None:
+                continue
+            path = reverse(name, kwargs={
+                argument: values[argument]
+                for argument in pattern.pattern.converters
+            })
+            method = 'post' if name in POST_DATA else 'get'
+            user = 'author' if name in AUTHOR_ROUTES else 'reader'
+            routes.append((name, clients[user], method, path))
+            if name in ANONYMOUS_ROUTES:
+                routes.append((
+                    f'{name}:anonymous',
+                    clients['anonymous'],
+                    method,
+                    path,
+                ))
+        return routes
+
+    def snapshot(self, reader, post):
+        last_comment = Comment.objects.order_by('-pk').values_list(
+            'pk',
+            flat=True,
+        ).first()
+        following = Follow.objects.filter(
+            user=reader,
+            author=post.author,
+        ).exists()
+        return last_comment or 0, following
+
+    def restore(self, reader, post, routes, state):
+        """Удаляет записи, созданные маршрутами замера, через ORM:
+        сигналы возвращают счётчики, статистику и ленты к прежним
+        значениям.
+        """
+        last_comment, following = state
+        Comment.objects.filter(pk__gt=last_comment).delete()
+        follow = Follow.objects.filter(user=reader, author=post.author)
+        if not following:
+            follow.delete()
+        elif not follow.exists() and reader != post.author:
+            Follow.objects.create(user=reader, author=post.author)
+        for client in {client for _, client, *_ in routes}:
+            client.logout()
+
+    def run(self, routes, iterations):
+        measured = {name: [] for name, *_ in routes}
+        with capture_requests() as captured:
+            for _ in range(iterations):
+                for name, client, method, path in routes:
+                    captured.clear()
+                    response = getattr(client, method)(
+                        path,
+                        POST_DATA.get(name),
+                    )
+                    # метрики потокового ответа приходят после отдачи тела
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    measured[name].extend(captured)
+        return measured
+
+    def summarize(self, measured, elapsed):
+        routes = {}
+        total = 0
+        for name, requests in measured.items():
+            times = [metrics.total_time for metrics in requests]
+            total += len(times)
+            routes[name] = {
+                'p50': round(percentile(times, 50), 2),
+                'p95': round(percentile(times, 95), 2),
+                'p99': round(percentile(times, 99), 2),
+                'queries': round(
+                    sum(metrics.queries for metrics in requests) / len(times),
+                    2,
+                ),
+                'rps': round(len(times) * 1000 / sum(times), 1),
+            }
+        return {
+            'routes': routes,
+            'requests': total,
+            'throughput': round(total / elapsed, 1),
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"route":<26}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"queries":>9}{"rps":>9}'
+        )
+        for name, row in results['routes'].items():
+            self.stdout.write(
+                f'{name:<26}{row["p50"]:>9}{row["p95"]:>9}{row["p99"]:>9}'
+                f'{row["queries"]:>9}{row["rps"]:>9}'
+            )
+        self.stdout.write(
+            f'Запросов: {results["requests"]}, '
+            f'пропускная способность: {results["throughput"]} req/s'
+        )
+
+    def compare(self, results, baseline, tolerance):
+        regressions = []
+        for name, row in results['routes'].items():
+            base = baseline['routes'].get(name)
+            if base is None:
+                continue
+            change = (row['p95'] - base['p95']) / base['p95'] if base[
+                'p95'] else 0
+            self.stdout.write(
+                f'{name:<26}p95 {base["p95"]} -> {row["p95"]} '
+                f'({change:+.0%}), queries {base["queries"]} -> '
+                f'{row["queries"]}'
+            )
+            if change > tolerance:
+                regressions.append(f'{name}: p95 вырос на {change:.0%}')
+            if row['queries'] > base['queries']:
+                regressions.append(
+                    f'{name}: SQL-запросов {row["queries"]} '
+                    f'вместо {base["queries"]}'
+                )
+        return regressions
+
+    def handle(self, *args, **options):
+        # запросы идут без общей транзакции, как на сервере: внутри
+        # неё чтение шло бы только с основной базы, on_commit не
+        # выполнялись бы, а транзакции view стали бы точками сохранения
+        reader, post = self.sample()
+        routes = self.routes(reader, post)
+        state = self.snapshot(reader, post)
+        try:
+            self.run(routes, options['warmup'])
+            start = perf_counter()
+            measured = self.run(routes, options['iterations'])
+            elapsed = perf_counter() - start
+        finally:
+            self.restore(reader, post, routes, state)
+        results = self.summarize(measured, elapsed)
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, ensure_ascii=False)
+        if options['baseline']:
+            with open(options['baseline']) as source:
+                baseline = json.load(source)
+            regressions = self.compare(
+                results,
+                baseline,
+                options['tolerance'],
+            )
+            if regressions:
+                raise CommandError(
+                    'Регрессии относительно baseline:\n'
+                    + '\n'.join(regressions)
+                )
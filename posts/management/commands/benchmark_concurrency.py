@@ -0,0 +1,186 @@
+import threading
+from time import perf_counter, sleep
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from posts.models import Post
+
+from .benchmark import percentile
+
+FEED_SIZE = 10
+JOURNAL_MODES = ('wal', 'delete')
+
+
+class Command(BaseCommand):
+    help = ('Читает ленту из нескольких потоков, пока другой поток держит '
+            'открытую транзакцию записи, в каждом режиме журнала SQLite, '
+            'и сравнивает задержки чтения и число ошибок '
+            '"database is locked". Данные не меняются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=5,
+            help='Длительность замера каждого режима в секундах',
+        )
+        parser.add_argument(
+            '--hold',
+            type=float,
+            default=0.05,
+            help='Сколько секунд пишущий держит открытую транзакцию',
+        )
+        parser.add_argument(
+            '--journal-mode',
+            action='append',
+            dest='journal_modes',
+            help='Режим PRAGMA journal_mode для замера, можно указать '
+                 'несколько раз; по умолчанию wal и delete',
+        )
+
+    def read(self, deadline, latencies, errors):
+        try:
+            while perf_counter() < deadline:
+                start = perf_counter()
+                try:
+                    list(Post.objects.select_related(
+                        'author',
+                        'group',
+                    ).order_by('-pub_date')[:FEED_SIZE])
+                except OperationalError:
+                    errors.append(1)
+                    continue
+                latencies.append((perf_counter() - start) * 1000)
+        finally:
+            connection.close()
+
+    def write(self, deadline, hold, post_id, written, errors):
+        # BEGIN EXCLUSIVE берёт блокировку, которую фиксация в режиме
+        # delete держит на время записи файла. Изменение откатывается,
+        # поэтому данные и счётчики остаются прежними
+        try:
+            with connection.cursor() as cursor:
+                while perf_counter() < deadline:
+                    try:
+                        cursor.execute('BEGIN EXCLUSIVE')
+                    except OperationalError:
+                        errors.append(1)
+                        continue
+                    try:
+                        cursor.execute(
+                            'UPDATE posts_post SET text = text WHERE id = %s',
+                            [post_id],
+                        )
+                        sleep(hold)
+                    finally:
+                        cursor.execute('ROLLBACK')
+                    written.append(1)
+        finally:
+            connection.close()
+
+    def run(self, journal_mode, options, post_id):
+        """Замер одного режима журнала: задержки чтения в мс, ошибки
+        чтения, число транзакций записи и ошибки записи.
+        """
+        # настройки общие для соединений всех потоков
+        connection.settings_dict['OPTIONS'].setdefault(
+            'pragmas',
+            {},
+        )['journal_mode'] = journal_mode
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            actual = cursor.fetchone()[0]
+        connection.close()
+        if actual != journal_mode:
+            raise CommandError(
+                f'Не удалось включить journal_mode={journal_mode}: база '
+                f'открыта другим процессом'
+            )
+
+        latencies, read_errors, written, write_errors = [], [], [], []
+        deadline = perf_counter() + options['duration']
+        threads = [
+            threading.Thread(
+                target=self.read,
+                args=(deadline, latencies, read_errors),
+            )
+            for _ in range(options['readers'])
+        ]
+        threads.append(threading.Thread(
+            target=self.write,
+            args=(deadline, options['hold'], post_id, written, write_errors),
+        ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, read_errors, written, write_errors
+
+    def report(self, journal_mode, duration, result):
+        latencies, read_errors, written, write_errors = result
+        self.stdout.write(f'journal_mode: {journal_mode}')
+        if latencies:
+            self.stdout.write(
+                f'  чтения: {len(latencies)} '
+                f'({len(latencies) / duration:.0f}/s), '
+                f'p50 {percentile(latencies, 50):.1f} ms, '
+                f'p95 {percentile(latencies, 95):.1f} ms, '
+                f'p99 {percentile(latencies, 99):.1f} ms, '
+                f'max {max(latencies):.1f} ms'
+            )
+        self.stdout.write(
+            f'  транзакций записи: {len(written)} '
+            f'({len(written) / duration:.0f}/s), '
+            f'ошибок чтения: {len(read_errors)}, '
+            f'ошибок записи: {len(write_errors)}'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            raise CommandError('Нужна база SQLite в файле')
+        post_id = Post.objects.values_list('pk', flat=True).first()
+        if post_id is None:
+            raise CommandError('Нет данных, запустите generate_data')
+        journal_modes = options['journal_modes'] or JOURNAL_MODES
+        pragmas = connection.settings_dict['OPTIONS'].get('pragmas', {})
+        saved = pragmas.get('journal_mode')
+        results = {}
+        try:
+            for journal_mode in journal_modes:
+                results[journal_mode] = self.run(
+                    journal_mode,
+                    options,
+                    post_id,
+                )
+        finally:
+            # следующее соединение вернёт базе режим из настроек
+            pragmas = connection.settings_dict['OPTIONS'].setdefault(
+                'pragmas',
+                {},
+            )
+            if saved is None:
+                pragmas.pop('journal_mode', None)
+            else:
+                pragmas['journal_mode'] = saved
+            connection.close()
+            connection.ensure_connection()
+
+        for journal_mode, result in results.items():
+            self.report(journal_mode, options['duration'], result)
+        p95 = {
+            journal_mode: percentile(result[0], 95)
+            for journal_mode, result in results.items()
+            if result[0]
+        }
+        if len(p95) > 1:
+            fastest = min(p95, key=p95.get)
+            for journal_mode, value in p95.items():
+                if journal_mode != fastest:
+                    self.stdout.write(
+                        f'p95 чтения в {journal_mode} выше, чем '
+                        f'в {fastest}, на {value - p95[fastest]:.1f} ms '
+                        f'({value / max(p95[fastest], 0.001):.1f}x)'
+                    )
@@ -0,0 +1,108 @@
+import os
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from posts import page_cache
+
+BATCH_SIZE = 500
+# точность LRU: файлы сравниваются по часу последнего показа
+BUCKET = 60 * 60
+
+
+class Command(BaseCommand):
+    help = ('Вытесняет давно не показанные миниатюры из media/cache, '
+            'пока каталог не уложится в THUMBNAIL_CACHE_MAX_BYTES. '
+            'Рассчитана на периодический запуск из cron')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-bytes',
+            type=int,
+            default=settings.THUMBNAIL_CACHE_MAX_BYTES,
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def files(self, path, name):
+        """Обходит дерево потоком: (имя, размер, час последнего показа)."""
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self.files(
+                        entry.path,
+                        f'{name}/{entry.name}',
+                    )
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    yield (
+                        f'{name}/{entry.name}',
+                        stat.st_size,
+                        int(stat.st_atime // BUCKET),
+                    )
+
+    def histogram(self, root, prefix):
+        """Первый проход: байты миниатюр по часам последнего показа."""
+        by_bucket = Counter()
+        for _, size, bucket in self.files(root, prefix):
+            by_bucket[bucket] += size
+        return by_bucket
+
+    @staticmethod
+    def cutoff(by_bucket, excess):
+        """Час, до которого включительно нужно вытеснять, и сколько байт
+        освободить внутри этого часа.
+        """
+        for bucket in sorted(by_bucket):
+            if by_bucket[bucket] >= excess:
+                return bucket, excess
+            excess -= by_bucket[bucket]
+        return bucket, by_bucket[bucket]
+
+    def evict(self, root, prefix, last_bucket, partial):
+        """Второй проход: удаляет файлы старше last_bucket и часть
+        файлов этого часа.
+        """
+        for name, size, bucket in self.files(root, prefix):
+            if bucket < last_bucket:
+                yield name, size
+            elif bucket == last_bucket and partial > 0:
+                partial -= size
+                yield name, size
+
+    def handle(self, *args, **options):
+        storage = default.storage
+        prefix = thumbnail_settings.THUMBNAIL_PREFIX.rstrip('/')
+        if not storage.exists(prefix):
+            return
+        root = storage.path(prefix)
+        by_bucket = self.histogram(root, prefix)
+        total = sum(by_bucket.values())
+        excess = total - options['max_bytes']
+        self.stdout.write(f'Миниатюры занимают {total} байт')
+        if excess <= 0:
+            return
+        last_bucket, partial = self.cutoff(by_bucket, excess)
+        evicted = self.evict(root, prefix, last_bucket, partial)
+        freed = removed = 0
+        while True:
+            batch = list(islice(evicted, BATCH_SIZE))
+            if not batch:
+                break
+            freed += sum(size for _, size in batch)
+            removed += len(batch)
+            if options['dry_run']:
+                continue
+            for name, _ in batch:
+                storage.delete(name)
+            default.kvstore.delete_many(
+                ImageFile(name, storage) for name, _ in batch
+            )
+        if removed and not options['dry_run']:
+            # карточки и страницы ссылаются на вытесненные файлы
+            page_cache.bump([page_cache.SITE])
+        self.stdout.write(f'Вытеснено миниатюр: {removed}, байт: {freed}')
@@ -0,0 +1,77 @@
+import json
+import sys
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import MODELS, Encoder
+
+CHUNK_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии и подписки в JSONL. '
+            'Записи читаются итератором по частям, память не растёт '
+            'с размером базы')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            nargs='?',
+            default='-',
+            help='Файл для выгрузки, по умолчанию stdout',
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            choices=list(MODELS),
+            default=list(MODELS),
+        )
+
+    def records(self, name, chunk_size):
+        model, paths = MODELS[name]
+        rows = model.objects.order_by('pk').values_list(
+            'pk',
+            *paths.values(),
+        )
+        for pk, *values in rows.iterator(chunk_size=chunk_size):
+            yield {
+                'model': name,
+                'pk': pk,
+                'fields': dict(zip(paths, values)),
+            }
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            output, log = sys.stdout, self.stderr
+        else:
+            output = open(options['output'], 'w', encoding='utf-8')
+            log = self.stdout
+        start = perf_counter()
+        total = 0
+        try:
+            # порядок MODELS: ссылки идут после записей, на которые
+            # они указывают
+            for name in MODELS:
+                if name not in options['models']:
+                    continue
+                count = 0
+                for record in self.records(name, options['chunk_size']):
+                    output.write(json.dumps(
+                        record,
+                        cls=Encoder,
+                        ensure_ascii=False,
+                    ))
+                    output.write('\n')
+                    count += 1
+                total += count
+                log.write(f'{name}: {count}')
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        elapsed = perf_counter() - start
+        log.write(
+            f'Выгружено записей: {total} за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-9):.0f}/s)'
+        )
@@ -0,0 +1,81 @@
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+
+from posts import counters, thumbnails
+from posts.models import Counter, Post
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки постов и их миниатюры, на которые не '
+            'ссылается ни один пост')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=60 * 60,
+            help=('Не трогать файлы, записанные или загруженные повторно '
+                  'за последние столько секунд: пост с ними может быть '
+                  'ещё не сохранён'),
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def files(self, storage, directory):
+        """Обходит каталог потоком, не собирая список файлов целиком."""
+        with os.scandir(storage.path(directory)) as entries:
+            for entry in entries:
+                name = f'{directory}/{entry.name}'
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self.files(storage, name)
+                elif not entry.name.endswith('.part'):
+                    # повторная загрузка отмечается временем доступа
+                    yield name, entry.stat().st_atime
+
+    def unreferenced(self, names):
+        keys = {counters.image_key(name): name for name in names}
+        stored = dict(Counter.objects.filter(name__in=keys).values_list(
+            'name',
+            'value',
+        ))
+        candidates = [
+            name for key, name in keys.items() if stored.get(key, 0) <= 0
+        ]
+        # счётчик мог отстать от базы, поэтому удаление проверяется точно
+        referenced = set(Post.objects.filter(
+            image__in=candidates,
+        ).values_list('image', flat=True))
+        return [name for name in candidates if name not in referenced]
+
+    def handle(self, *args, **options):
+        field = Post._meta.get_field('image')
+        storage = field.storage
+        directory = field.upload_to.rstrip('/')
+        if not storage.exists(directory):
+            return
+        deadline = time.time() - options['grace']
+        files = (
+            name
+            for name, used in self.files(storage, directory)
+            if used < deadline
+        )
+        removed = 0
+        while True:
+            batch = list(islice(files, BATCH_SIZE))
+            if not batch:
+                break
+            for name in self.unreferenced(batch):
+                removed += 1
+                if options['dry_run']:
+                    self.stdout.write(name)
+                    continue
+                # удаляет записи KVStore и файлы миниатюр картинки
+                default.kvstore.delete(thumbnails.source(name))
+                storage.delete(name)
+                counters.invalidate([counters.image_key(name)])
+        self.stdout.write(f'Удалено картинок: {removed}')
@@ -0,0 +1,218 @@
+import datetime as dt
+import io
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from posts import page_cache
+from posts.models import Comment, Follow, Group, Post, User
+from posts.transfer import keep_dates
+
+BATCH_SIZE = 500
+IMAGE_SIZE = (1200, 800)
+
+
+def zipf_weights(count, exponent):
+    """Веса рангов 1..count по закону Ципфа: первые немногие элементы
+    получают большую часть выборок.
+    """
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    help = ('Создаёт синтетические данные для нагрузочных замеров: '
+            'пользователей, группы, посты с неравномерным распределением '
+            'по авторам, комментарии, подписки со степенным распределением '
+            'и картинки. Даты постов и комментариев разбросаны по --days '
+            'дням. Повторный запуск с тем же --prefix использует уже '
+            'созданных пользователей и группы и добавляет посты')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--images',
+            type=int,
+            default=20,
+            help='Количество разных картинок, которые получат посты',
+        )
+        parser.add_argument(
+            '--image-ratio',
+            type=float,
+            default=0.2,
+            help='Доля постов с картинкой',
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель Ципфа для авторов и популярности',
+        )
+        parser.add_argument(
+            '--follow-alpha',
+            type=float,
+            default=1.5,
+            help='Параметр Парето для числа подписок пользователя',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько последних дней распределить даты постов',
+        )
+        parser.add_argument('--prefix', default='synthetic')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def create_users(self, options):
+        # один хэш на всех: make_password медленный
+        password = make_password(options['prefix'])
+        usernames = [
+            f'{options["prefix"]}{number}'
+            for number in range(options['users'])
+        ]
+        # пользователи прошлого запуска с тем же префиксом пропускаются
+        User.objects.bulk_create(
+            (User(username=name, password=password) for name in usernames),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        return list(User.objects.filter(
+            username__in=usernames,
+        ).order_by('pk'))
+
+    def create_groups(self, options):
+        slugs = [
+            f'{options["prefix"]}-{number}'
+            for number in range(options['groups'])
+        ]
+        Group.objects.bulk_create(
+            (
+                Group(
+                    title=f'Группа {number}',
+                    slug=slug,
+                    description=f'Описание группы {number}',
+                )
+                for number, slug in enumerate(slugs)
+            ),
+            ignore_conflicts=True,
+        )
+        return list(Group.objects.filter(slug__in=slugs).order_by('pk'))
+
+    def random_date(self, start, end):
+        return start + (end - start) * self.random.random()
+
+    def create_images(self, options):
+        names = []
+        for number in range(options['images']):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new('RGB', IMAGE_SIZE, color).save(buffer, 'JPEG')
+            # то же хранилище, что у загрузок: имена по хэшу в подкаталогах
+            names.append(Post._meta.get_field('image').storage.save(
+                f'posts/{options["prefix"]}-{number}.jpg',
+                ContentFile(buffer.getvalue()),
+            ))
+        return names
+
+    def create_posts(self, options, users, groups, images):
+        authors = self.random.choices(
+            users,
+            zipf_weights(len(users), options['skew']),
+            k=options['posts'],
+        )
+        end = timezone.now()
+        start = end - dt.timedelta(days=options['days'])
+        posts = []
+        for number, author in enumerate(authors):
+            post = Post(
+                text=f'Синтетический пост {number}',
+                author=author,
+                group=self.random.choice(groups + [None]) if groups else None,
+                pub_date=self.random_date(start, end),
+            )
+            if images and self.random.random() < options['image_ratio']:
+                post.image = self.random.choice(images)
+                post.image_width, post.image_height = IMAGE_SIZE
+            posts.append(post)
+        Post.objects.bulk_create(posts, batch_size=BATCH_SIZE)
+        return list(Post.objects.filter(author__in=users).values_list(
+            'pk',
+            'pub_date',
+        ))
+
+    def create_comments(self, options, users, posts):
+        if not posts:
+            return
+        targets = self.random.choices(
+            posts,
+            zipf_weights(len(posts), options['skew']),
+            k=options['comments'],
+        )
+        end = timezone.now()
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    post_id=post_id,
+                    author=self.random.choice(users),
+                    text=f'Комментарий {number}',
+                    # комментарий не старше своего поста
+                    created=self.random_date(pub_date, end),
+                )
+                for number, (post_id, pub_date) in enumerate(targets)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+    def create_follows(self, options, users):
+        weights = zipf_weights(len(users), options['skew'])
+        follows = set()
+        for user in users:
+            count = min(
+                int(self.random.paretovariate(options['follow_alpha'])),
+                len(users) - 1,
+            )
+            for author in self.random.choices(users, weights, k=count):
+                if author != user:
+                    follows.add((user.pk, author.pk))
+        Follow.objects.bulk_create(
+            (
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in follows
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        return len(follows)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        # auto_now_add заменил бы все даты временем запуска, и ленты
+        # сортировались бы по одинаковым pub_date
+        with transaction.atomic(), keep_dates():
+            users = self.create_users(options)
+            groups = self.create_groups(options)
+            images = self.create_images(options)
+            posts = self.create_posts(options, users, groups, images)
+            self.create_comments(options, users, posts)
+            follows = self.create_follows(options, users)
+        self.stdout.write(
+            f'Готово: пользователей {len(users)}, групп {len(groups)}, '
+            f'новых постов {options["posts"]}, '
+            f'комментариев {options["comments"]}, подписок {follows}, '
+            f'картинок {len(images)}'
+        )
+        # bulk_create не отправляет сигналы, поэтому производные данные
+        # пересчитываются целиком
+        call_command('repair_comment_counts', stdout=self.stdout)
+        call_command('rebuild_user_stats', stdout=self.stdout)
+        call_command('rebuild_timelines', stdout=self.stdout)
+        call_command('reconcile_counters', stdout=self.stdout)
+        page_cache.bump([page_cache.SITE])
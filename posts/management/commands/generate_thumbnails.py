@@ -0,0 +1,125 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.images import deserialize_image_file, serialize_image_file
+
+from posts import page_cache, thumbnails
+from posts.models import Post
+
+CHUNK_SIZE = 100
+
+
+def render(name, force):
+    """Выполняется в процессе пула: создаёт файлы миниатюр и отдаёт
+    записи для KVStore в сериализованном виде. Процесс не обращается
+    к базе, все записи делает основной процесс.
+
+    Ошибка одной картинки возвращается текстом вместо записей, чтобы
+    не прерывать обработку остальных.
+    """
+    try:
+        source, files = thumbnails.render(name, force)
+    except Exception as error:
+        # PIL поднимает не только OSError: DecompressionBombError,
+        # ValueError, SyntaxError для испорченных файлов
+        return name, None, f'{type(error).__name__}: {error}'
+    return name, (
+        serialize_image_file(source),
+        [serialize_image_file(thumbnail) for thumbnail in files],
+    ), None
+
+
+class Command(BaseCommand):
+    help = ('Заранее создаёт все миниатюры картинок постов, включая '
+            'адаптивные варианты карточки в WebP и JPEG. Картинки '
+            'обрабатываются пачками в пуле процессов, записи KVStore '
+            'пишутся пачкой на каждую пачку картинок')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Число процессов, по умолчанию по числу ядер',
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать и уже готовые миниатюры',
+        )
+        parser.add_argument(
+            '--after',
+            default='',
+            help='Продолжить с картинки, следующей за этой',
+        )
+
+    def chunks(self, after, size):
+        names = Post.objects.exclude(image='').exclude(
+            image__isnull=True,
+        ).order_by('image').values_list('image', flat=True).distinct()
+        while True:
+            chunk = list(names.filter(image__gt=after)[:size])
+            if not chunk:
+                return
+            after = chunk[-1]
+            yield chunk
+
+    def incomplete(self, names):
+        """Картинки, у которых не хватает хотя бы одной миниатюры:
+        повторный запуск пропускает уже обработанные.
+        """
+        all_sizes = thumbnails.sizes().values()
+        files = [
+            thumbnails.backend.thumbnail_file(
+                thumbnails.source(name),
+                geometry,
+                **options,
+            )
+            for name in names
+            for geometry, options in all_sizes
+        ]
+        found = iter(default.kvstore.get_many(files))
+        return [
+            name for name in names
+            if None in [next(found) for _ in all_sizes]
+        ]
+
+    def handle(self, *args, **options):
+        force = options['force']
+        generated = skipped = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for names in self.chunks(options['after'],
+                                     options['chunk_size']):
+                todo = names if force else self.incomplete(names)
+                skipped += len(names) - len(todo)
+                entries = []
+                for name, entry, error in pool.map(
+                    render,
+                    todo,
+                    [force] * len(todo),
+                ):
+                    if entry is None:
+                        self.stderr.write(f'Не удалось обработать {name}: '
+                                          f'{error}')
+                        failed += 1
+                        continue
+                    source, files = entry
+                    entries.append((
+                        deserialize_image_file(source),
+                        list(map(deserialize_image_file, files)),
+                    ))
+                default.kvstore.set_many(entries)
+                generated += len(entries)
+                self.stdout.write(
+                    f'Обработано картинок: {generated}, '
+                    f'пропущено готовых: {skipped}; '
+                    f'продолжить: --after {names[-1]}'
+                )
+        page_cache.bump([page_cache.SITE])
+        self.stdout.write(
+            f'Готово: обработано {generated}, пропущено {skipped}, '
+            f'с ошибками {failed}'
+        )
@@ -0,0 +1,159 @@
+import json
+import os
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from posts import page_cache
+from posts.models import User
+from posts.transfer import MODELS, build, keep_dates, usernames, validate
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Загружает JSONL из export_jsonl пачками через bulk_create '
+            'в пустые таблицы групп, постов, комментариев и подписок. '
+            'Каждая пачка — отдельная транзакция, номер последней '
+            'загруженной строки пишется в файл checkpoint, и прерванная '
+            'загрузка продолжается с него. Отсутствующие пользователи '
+            'создаются без пароля')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с номером загруженной строки, по умолчанию '
+                 '<input>.checkpoint',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать сначала, не читая checkpoint',
+        )
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as file:
+                return json.load(file)['line']
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, path, line):
+        temporary = f'{path}.part'
+        with open(temporary, 'w') as file:
+            json.dump({'line': line}, file)
+        os.replace(temporary, path)
+
+    def check_empty(self):
+        """Записи сохраняют pk из выгрузки, поэтому новая загрузка
+        идёт только в пустые таблицы: иначе пост с занятым pk был бы
+        пропущен, а его комментарии попали бы к чужому посту.
+        """
+        filled = [
+            name for name, (model, _) in MODELS.items()
+            if model.objects.exists()
+        ]
+        if filled:
+            raise CommandError(
+                f'Таблицы не пусты: {", ".join(filled)}. Загрузка '
+                f'сохраняет pk из выгрузки и возможна только в пустые '
+                f'таблицы'
+            )
+
+    def user_ids(self, records):
+        names = {name for record in records for name in usernames(record)}
+        ids = dict(User.objects.filter(
+            username__in=names,
+        ).values_list('username', 'id'))
+        missing = names - set(ids)
+        if missing:
+            User.objects.bulk_create(
+                (
+                    User(username=name, password=make_password(None))
+                    for name in missing
+                ),
+                ignore_conflicts=True,
+            )
+            ids.update(User.objects.filter(
+                username__in=missing,
+            ).values_list('username', 'id'))
+        return ids
+
+    def flush(self, batch, checkpoint):
+        """Загружает пачку строк одной модели в одной транзакции
+        и отмечает её в checkpoint.
+
+        Уже загруженные строки пропускаются, поэтому повтор пачки после
+        сбоя между фиксацией и записью checkpoint безопасен.
+        """
+        first, last = batch[0][0], batch[-1][0]
+        try:
+            with transaction.atomic():
+                user_ids = self.user_ids(record for _, record in batch)
+                instances = []
+                for number, record in batch:
+                    try:
+                        instances.append(build(record, user_ids))
+                    except (KeyError, TypeError, ValueError,
+                            ValidationError) as error:
+                        raise CommandError(f'Строка {number}: {error}')
+                model = type(instances[0])
+                model.objects.bulk_create(instances, ignore_conflicts=True)
+        except IntegrityError as error:
+            raise CommandError(f'Строки {first}-{last}: {error}')
+        self.write_checkpoint(checkpoint, last)
+        self.loaded += len(batch)
+        elapsed = perf_counter() - self.start
+        self.stdout.write(
+            f'{batch[0][1]["model"]}: строка {last}, '
+            f'загружено {self.loaded} ({self.loaded / elapsed:.0f}/s)'
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint'] or f'{options["input"]}.checkpoint'
+        done = 0 if options['restart'] else self.read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f'Продолжение после строки {done}')
+        else:
+            self.check_empty()
+        self.start = perf_counter()
+        self.loaded = 0
+        batch = []
+        with keep_dates(), open(options['input'], encoding='utf-8') as file:
+            for number, line in enumerate(file, 1):
+                if number <= done or not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    validate(record)
+                except ValueError as error:
+                    raise CommandError(f'Строка {number}: {error}')
+                model = record['model']
+                if batch and (
+                    len(batch) >= options['batch_size']
+                    or batch[0][1]['model'] != model
+                ):
+                    self.flush(batch, checkpoint)
+                    batch = []
+                batch.append((number, record))
+            if batch:
+                self.flush(batch, checkpoint)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(
+            f'Загружено записей: {self.loaded} за '
+            f'{perf_counter() - self.start:.1f} с'
+        )
+        # bulk_create не отправляет сигналы, поэтому производные данные
+        # пересчитываются целиком
+        call_command('repair_comment_counts', stdout=self.stdout)
+        call_command('rebuild_user_stats', stdout=self.stdout)
+        call_command('rebuild_timelines', stdout=self.stdout)
+        call_command('reconcile_counters', stdout=self.stdout)
+        page_cache.bump([page_cache.SITE])
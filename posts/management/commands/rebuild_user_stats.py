@@ -0,0 +1,27 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import stats
+from posts.models import User, UserStats
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает таблицу UserStats по подпискам, постам '
+            'и комментариям')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        UserStats.objects.all().delete()
+        rows = stats.exact_stats(User.objects.order_by('pk')).iterator()
+        rebuilt = 0
+        while True:
+            batch = [stats.build(row) for row in islice(rows, BATCH_SIZE)]
+            if not batch:
+                break
+            UserStats.objects.bulk_create(batch)
+            rebuilt += len(batch)
+        self.stdout.write(f'Пересчитано пользователей: {rebuilt}')
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts import counters
+from posts.models import Counter, Group, Post, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = ('Сверяет счётчики записей с точным COUNT и исправляет '
+            'расхождения. Рассчитана на периодический запуск из cron')
+
+    def exact_counts(self):
+        yield counters.POSTS, Post.objects.count()
+        # пустые группы тоже получают счётчик: чтение их не создаёт
+        by_group = Group.objects.order_by().annotate(
+            total=Count('posts'),
+        ).values_list('id', 'total')
+        for group_id, total in by_group.iterator():
+            yield counters.group_key(group_id), total
+        by_image = Post.objects.exclude(image='').exclude(
+            image__isnull=True,
+        ).order_by().values('image').annotate(
+            total=Count('id'),
+        ).values_list('image', 'total')
+        for name, total in by_image.iterator():
+            yield counters.image_key(name), total
+        by_reader = TimelineEntry.objects.order_by().values(
+            'user_id',
+        ).annotate(total=Count('id')).values_list('user_id', 'total')
+        for user_id, total in by_reader.iterator():
+            yield counters.timeline_key(user_id), total
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        stored = dict(Counter.objects.values_list('name', 'value'))
+        exact = dict(self.exact_counts())
+        fixed = 0
+        for name, value in exact.items():
+            if stored.pop(name, None) != value:
+                Counter.objects.update_or_create(
+                    name=name,
+                    defaults={'value': value},
+                )
+                fixed += 1
+        # оставшиеся счётчики относятся к пустым лентам и группам
+        stale = [name for name, value in stored.items() if value != 0]
+        Counter.objects.filter(name__in=stale).update(value=0)
+        fixed += len(stale)
+        self.stdout.write(f'Исправлено счётчиков: {fixed}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает поле Post.comment_count по таблице комментариев'
+
+    def handle(self, *args, **options):
+        totals = Comment.objects.filter(post=OuterRef('pk')).values(
+            'post',
+        ).annotate(total=Count('id')).values('total')
+        exact = Coalesce(Subquery(totals), 0)
+        drifted = Post.objects.annotate(exact=exact).exclude(
+            comment_count=exact,
+        )
+        fixed = drifted.update(comment_count=exact)
+        self.stdout.write(f'Исправлено постов: {fixed}')
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from sorl.thumbnail import default
+
+from posts import counters, page_cache, thumbnails
+from posts.models import Post
+from posts.storage import is_sharded, sharded_name
+
+BATCH_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки постов из плоского каталога в '
+            'подкаталоги по хэшу содержимого и переписывает Post.image. '
+            'Перенос идёт пачками, прерванный запуск можно повторить')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Остановиться после стольких картинок',
+        )
+
+    def pending(self, after):
+        return Post.objects.exclude(image='').exclude(
+            image__isnull=True,
+        ).filter(image__gt=after).order_by('image').values_list(
+            'image',
+            flat=True,
+        ).distinct()
+
+    def target(self, storage, name):
+        digest = hashlib.sha256()
+        with storage.open(name) as file:
+            for chunk in file.chunks():
+                digest.update(chunk)
+        return sharded_name(name, digest.hexdigest())
+
+    def place(self, storage, name, target):
+        """Кладёт копию файла по новому имени, не трогая старый: до
+        фиксации новых имён в базе старый файл должен оставаться.
+        """
+        if storage.exists(target):
+            return
+        source, destination = storage.path(name), storage.path(target)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        temporary = f'{destination}.part'
+        try:
+            os.link(source, temporary)
+        except OSError:
+            shutil.copyfile(source, temporary)
+        os.replace(temporary, destination)
+
+    def move_batch(self, storage, names):
+        moves = {}
+        missing = 0
+        for name in names:
+            if is_sharded(name):
+                continue
+            if not storage.exists(name):
+                missing += 1
+                continue
+            target = self.target(storage, name)
+            self.place(storage, name, target)
+            moves[name] = target
+        with transaction.atomic():
+            for name, target in moves.items():
+                Post.objects.filter(image=name).update(
+                    image=target,
+                )
+            # update() не отправляет сигналы, счётчики ссылок
+            # пересчитаются при чтении
+            counters.invalidate([
+                counters.image_key(name)
+                for pair in moves.items()
+                for name in pair
+            ])
+        for name in moves:
+            # старые миниатюры привязаны к старому имени исходника
+            default.kvstore.delete(thumbnails.source(name))
+            storage.delete(name)
+        return len(moves), missing
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        moved = missing = 0
+        after = ''
+        limit = options['limit']
+        while limit is None or moved < limit:
+            size = options['batch_size']
+            if limit is not None:
+                size = min(size, limit - moved)
+            names = list(self.pending(after)[:size])
+            if not names:
+                break
+            after = names[-1]
+            batch_moved, batch_missing = self.move_batch(storage, names)
+            moved += batch_moved
+            missing += batch_missing
+            self.stdout.write(f'Перенесено картинок: {moved}')
+        if moved:
+            page_cache.bump([page_cache.SITE])
+        self.stdout.write(
+            f'Готово: перенесено {moved}, файлов не найдено {missing}'
+        )
@@ -0,0 +1,27 @@
+import sqlite3
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PAGES_PER_STEP = 1024
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик '
+            'DATABASE_REPLICAS через backup API. Основная база остаётся '
+            'доступной для записи во время копирования')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Команда копирует только базы SQLite')
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias]
+            replica.close()
+            name = replica.settings_dict['NAME']
+            with closing(sqlite3.connect(name)) as target:
+                primary.connection.backup(target, pages=PAGES_PER_STEP)
+            self.stdout.write(f'{alias}: скопировано в {name}')
@@ -0,0 +1,136 @@
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _etag(path, stat):
+    # старые картинки, данные generate_data и миниатюры после --force
+    # могут получить прежнее имя и размер при другом содержимом, поэтому
+    # в ETag входит и время изменения. Отметки использования меняют
+    # только время доступа и ETag не трогают
+    digest = hashlib.md5(path.encode()).hexdigest()
+    return f'"{digest}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _byte_range(request, size, etag):
+    """Диапазон (start, end) из заголовка Range или None для ответа
+    целым файлом. Несколько диапазонов и неверные диапазоны, как
+    требует RFC 7233, отдаются целым файлом.
+    """
+    header = request.META.get('HTTP_RANGE')
+    if not header:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and etag not in parse_etags(if_range):
+        return None
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # bytes=-N: последние N байт
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve(request, path):
+    """Отдаёт файл из MEDIA_ROOT.
+
+    Поддерживает условные запросы (ETag, Last-Modified, 304) и Range.
+    Если настроены MEDIA_ACCEL_REDIRECT или MEDIA_SENDFILE, сам файл
+    отдаёт фронтовой сервер, а Django отвечает только заголовками.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    etag = _etag(path, stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+    )
+    if response is None:
+        response = _file_response(request, path, full_path, stat, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=settings.MEDIA_CACHE_MAX_AGE,
+    )
+    return response
+
+
+def _file_response(request, path, full_path, stat, etag):
+    content_type = mimetypes.guess_type(full_path)[0]
+    content_type = content_type or 'application/octet-stream'
+    if settings.MEDIA_ACCEL_REDIRECT:
+        # nginx сам обработает Range из исходного запроса
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_REDIRECT + quote(path)
+        )
+        return response
+    if settings.MEDIA_SENDFILE:
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return response
+    size = stat.st_size
+    byte_range = _byte_range(request, size, etag)
+    if byte_range is None:
+        response = FileResponse(
+            open(full_path, 'rb'),
+            content_type=content_type,
+        )
+    else:
+        start, end = byte_range
+        if start >= size:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        response = StreamingHttpResponse(
+            _read(full_path, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
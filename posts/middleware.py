@@ -0,0 +1,72 @@
+import logging
+
+from django.conf import settings
+
+from .performance import measure, request_measured
+
+logger = logging.getLogger('posts.performance')
+
+
+class PerformanceMiddleware:
+    """Измеряет SQL-запросы, время базы, шаблонов и всего запроса
+    для каждого view и сверяет их с бюджетами settings.VIEW_BUDGETS.
+
+    Тело потокового ответа измеряется по мере отдачи, и итог попадает
+    в лог и сигнал request_measured после последней части: карточки
+    лент рендерятся уже после выхода из view.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with measure(request.path) as metrics:
+            response = self.get_response(request)
+        if request.resolver_match is not None:
+            metrics.url_name = request.resolver_match.url_name
+        if response.streaming:
+            response.streaming_content = self.measure_stream(
+                response.streaming_content,
+                metrics,
+            )
+            return response
+        self.report(metrics)
+        if settings.DEBUG:
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_time:.1f}, '
+                f'tpl;dur={metrics.template_time:.1f}, '
+                f'total;dur={metrics.total_time:.1f}'
+            )
+        return response
+
+    def measure_stream(self, chunks, metrics):
+        chunks = iter(chunks)
+        try:
+            while True:
+                with measure(metrics.path, metrics):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+        except Exception:
+            # статус 200 уже отправлен, клиент получит оборванную
+            # страницу, а ошибка останется только в логе
+            logger.exception(
+                'Ошибка при отдаче тела %s',
+                metrics.url_name or metrics.path,
+            )
+            raise
+        finally:
+            self.report(metrics)
+
+    def report(self, metrics):
+        request_measured.send(sender=self.__class__, metrics=metrics)
+        for problem in metrics.violations():
+            logger.warning('Превышен бюджет: %s', problem)
+        logger.debug(
+            '%s: %d queries, db %.1f ms, templates %.1f ms, total %.1f ms',
+            metrics.url_name or metrics.path,
+            metrics.queries,
+            metrics.db_time,
+            metrics.template_time,
+            metrics.total_time,
+        )
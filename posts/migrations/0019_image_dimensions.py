@@ -0,0 +1,40 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:15
+
+from django.core.files.images import get_image_dimensions
+from django.db import migrations, models
+
+
+def read_dimensions(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+    for post in posts.iterator():
+        try:
+            # Pillow читает только заголовок файла
+            width, height = get_image_dimensions(post.image)
+        except OSError:
+            continue
+        Post.objects.filter(pk=post.pk).update(
+            image_width=width,
+            image_height=height,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина картинки'),
+        ),
+        migrations.RunPython(read_dimensions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:26
+
+import base64
+import io
+
+from django.db import migrations, models
+from PIL import Image, ImageOps
+
+# значения настроек на момент миграции: код приложения и настройки
+# могут измениться, а миграция должна давать тот же результат
+CARD_SIZE = (960, 339)
+PLACEHOLDER_WIDTH = 24
+PLACEHOLDER_QUALITY = 60
+
+
+def placeholder(image):
+    width, height = CARD_SIZE
+    size = (
+        PLACEHOLDER_WIDTH,
+        max(round(PLACEHOLDER_WIDTH * height / width), 1),
+    )
+    image = ImageOps.fit(image.convert('RGB'), size, Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=PLACEHOLDER_QUALITY)
+    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def make_placeholders(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    storage = Post._meta.get_field('image').storage
+    names = Post.objects.exclude(image='').exclude(
+        image__isnull=True,
+    ).order_by().values_list('image', flat=True).distinct()
+    for name in names.iterator():
+        try:
+            with storage.open(name) as file, Image.open(file) as image:
+                image.draft('RGB', (image.width // 8, image.height // 8))
+                value = placeholder(image)
+        except OSError:
+            continue
+        Post.objects.filter(image=name).update(image_placeholder=value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Заглушка картинки'),
+        ),
+        migrations.RunPython(make_placeholders, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -52,12 +54,56 @@ class Post(models.Model):
     )
     image = models.ImageField(
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
         null=True
     )
+    # размеры сохраняются при загрузке (PostForm), чтобы шаблоны
+    # размечали картинку, не открывая файл
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    # data URI крошечной копии картинки (images.placeholder), карточка
+    # показывает её на месте ещё не загруженной миниатюры
+    image_placeholder = models.TextField(
+        'Заглушка картинки',
+        blank=True,
+        editable=False,
+    )
+    # поддерживается сигналами Comment, чтобы карточка поста не считала
+    # комментарии отдельным запросом
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        # индексы повторяют порядок лент: (pub_date, id) по убыванию
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         if self.group:
@@ -89,6 +135,15 @@ class Comment(models.Model):
         auto_now_add=True,
     )
 
+    class Meta:
+        ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx',
+            ),
+        )
+
 
 class Follow(models.Model):
     # пользователь, который подписывается
@@ -103,3 +158,93 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
     )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow',
+            ),
+        )
+
+
+class TimelineEntry(models.Model):
+    """Запись в материализованной ленте подписок пользователя.
+
+    Строки создаются при публикации поста (fan-out on write), поэтому
+    страница ``/follow/`` читается одним диапазоном по индексу
+    ``(user, pub_date)`` без соединения Post и Follow.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    # автор и дата копируются из поста, чтобы отписка и сортировка
+    # не требовали соединения с таблицей постов
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date', '-post')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='timeline_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='timeline_user_author_idx',
+            ),
+        )
+
+
+class Counter(models.Model):
+    """Поддерживаемый счётчик записей для пагинатора.
+
+    Имена счётчиков строятся функциями из ``posts.counters``.
+    """
+    name = models.CharField(
+        max_length=100,
+        primary_key=True,
+    )
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
+
+class UserStats(models.Model):
+    """Счётчики для боковой панели профиля.
+
+    Поддерживаются сигналами подписок, постов и комментариев; при
+    расхождении пересобираются командой rebuild_user_stats.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    followers = models.PositiveIntegerField('Подписчиков', default=0)
+    following = models.PositiveIntegerField('Подписок', default=0)
+    posts = models.PositiveIntegerField('Записей', default=0)
+    comments = models.PositiveIntegerField('Комментариев', default=0)
+
+    def __str__(self):
+        return f'Статистика {self.user.username}'
@@ -0,0 +1,108 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .counters import get_count
+
+POSTS_PER_PAGE = 10
+
+# Направления курсора: следующая страница (после записи) и предыдущая
+# (до записи).
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, number, item, keys):
+    values = [getattr(item, key) for key in keys]
+    payload = [direction, number, values[0].isoformat(), *values[1:]]
+    return urlsafe_b64encode(
+        json.dumps(payload, separators=(',', ':')).encode()
+    ).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Разбирает курсор, полученный из query string.
+
+    Испорченный или подделанный курсор не считается ошибкой: в этом
+    случае возвращается None и страница строится по номеру.
+    """
+    if not token:
+        return None
+    try:
+        padding = '=' * (-len(token) % 4)
+        direction, number, moment, pk = json.loads(
+            urlsafe_b64decode(token + padding)
+        )
+        moment = parse_datetime(moment)
+    except (TypeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or moment is None:
+        return None
+    if not isinstance(number, int) or not isinstance(pk, int):
+        return None
+    return direction, max(number, 1), moment, pk
+
+
+def _keyset_page(paginator, cursor, keys):
+    direction, number, moment, pk = cursor
+    date_key, id_key = keys
+    queryset = paginator.object_list
+    if direction == NEXT:
+        queryset = queryset.filter(
+            Q(**{f'{date_key}__lt': moment}) |
+            Q(**{date_key: moment, f'{id_key}__lt': pk})
+        )
+    else:
+        queryset = queryset.filter(
+            Q(**{f'{date_key}__gt': moment}) |
+            Q(**{date_key: moment, f'{id_key}__gt': pk})
+        ).reverse()
+    items = list(queryset[:paginator.per_page + 1])
+    has_more = len(items) > paginator.per_page
+    items = items[:paginator.per_page]
+    if direction == NEXT:
+        return Page(items, number, paginator), has_more, True
+    items.reverse()
+    return Page(items, number, paginator), True, has_more
+
+
+def paginate(request, queryset, per_page=POSTS_PER_PAGE,
+             keys=('pub_date', 'id'), count_key=None, count=None):
+    """Возвращает пару (paginator, page) для ленты записей.
+
+    Если в запросе передан ``?cursor=``, страница выбирается по ключу
+    ``(pub_date, id)`` без OFFSET, поэтому её стоимость не зависит от
+    глубины. Иначе работает обычная нумерация ``?page=N``. В обоих
+    случаях у страницы есть ``next_cursor`` и ``previous_cursor``.
+
+    Если передан ``count_key``, общее число записей берётся из счётчика
+    ``posts.counters`` вместо ``SELECT COUNT(*)``; готовое значение
+    можно передать через ``count``.
+    """
+    queryset = queryset.order_by(*(f'-{key}' for key in keys))
+    paginator = Paginator(queryset, per_page)
+    if count is None and count_key is not None:
+        count = get_count(count_key, queryset)
+    if count is not None:
+        # count у Paginator — cached_property, значение из счётчика
+        # подставляется в него заранее
+        paginator.count = count
+    cursor = decode_cursor(request.GET.get('cursor'))
+    if cursor is None:
+        page = paginator.get_page(request.GET.get('page'))
+        has_next, has_previous = page.has_next(), page.has_previous()
+    else:
+        page, has_next, has_previous = _keyset_page(paginator, cursor, keys)
+    page.next_cursor = page.previous_cursor = None
+    if len(page) and has_next:
+        page.next_cursor = encode_cursor(
+            NEXT, page.number + 1, page[-1], keys
+        )
+    if len(page) and has_previous:
+        page.previous_cursor = encode_cursor(
+            PREVIOUS, page.number - 1, page[0], keys
+        )
+    return paginator, page
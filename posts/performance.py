@@ -0,0 +1,136 @@
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import Signal
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+# отправляется после каждого измеренного запроса, аргумент metrics
+request_measured = Signal(providing_args=['metrics'])
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Число SQL-запросов и время одного HTTP-запроса.
+
+    Время хранится в миллисекундах. У потоковых ответов в него входит
+    и отдача тела, без ожидания клиента между частями.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.url_name = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+        self._rendering = False
+
+    def __repr__(self):
+        return (f'<RequestMetrics {self.url_name or self.path}: '
+                f'{self.queries} queries, {self.total_time:.1f} ms>')
+
+    def record_query(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += (perf_counter() - start) * 1000
+
+    def budget(self):
+        return settings.VIEW_BUDGETS.get(self.url_name)
+
+    def violations(self, timing=True):
+        """Список превышений бюджета view, пустой если бюджет соблюдён.
+
+        С ``timing=False`` проверяется только число SQL-запросов: время
+        зависит от машины, и тесты его только пишут в лог.
+        """
+        budget = self.budget()
+        if budget is None:
+            return []
+        problems = []
+        if self.queries > budget['queries']:
+            problems.append(
+                f'{self.url_name}: {self.queries} SQL-запросов, '
+                f'бюджет {budget["queries"]}'
+            )
+        if timing and self.total_time > budget['time']:
+            problems.append(
+                f'{self.url_name}: {self.total_time:.1f} мс, '
+                f'бюджет {budget["time"]} мс'
+            )
+        return problems
+
+
+@contextmanager
+def measure(path, metrics=None):
+    """Измеряет SQL-запросы, шаблоны и время внутри блока.
+
+    Переданный ``metrics`` продолжает начатое измерение: так к запросу
+    добавляется работа, сделанная при отдаче потокового тела.
+    """
+    if metrics is None:
+        metrics = RequestMetrics(path)
+    token = _current.set(metrics)
+    start = perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(metrics.record_query)
+                )
+            yield metrics
+    finally:
+        metrics.total_time += (perf_counter() - start) * 1000
+        _current.reset(token)
+
+
+@contextmanager
+def capture_requests():
+    """Собирает RequestMetrics всех запросов внутри блока."""
+    captured = []
+
+    def collect(sender, metrics, **kwargs):
+        captured.append(metrics)
+
+    request_measured.connect(collect, weak=False)
+    try:
+        yield captured
+    finally:
+        request_measured.disconnect(collect)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        # вложенные шаблоны уже учтены во времени внешнего
+        if metrics is None or metrics._rendering:
+            return super().render(context, request)
+        metrics._rendering = True
+        start = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += (perf_counter() - start) * 1000
+            metrics._rendering = False
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд шаблонов Django, учитывающий время рендеринга."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name),
+                self,
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,93 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# метка в cookie: запросы с ней читают с основной базы
+PIN_COOKIE = 'read_primary'
+
+_pinned = ContextVar('read_primary', default=False)
+_writes = ContextVar('database_writes', default=None)
+
+
+class PrimaryReplicaRouter:
+    """Пишет в основную базу, читает с реплик DATABASE_REPLICAS.
+
+    Чтение идёт с основной базы, если реплик нет, внутри транзакции
+    и в запросах с меткой PIN_COOKIE, которую получает пользователь
+    после записи: реплика может отставать, а свои изменения автор
+    должен видеть сразу. По основной базе строятся и страницы для
+    кэша анонимных пользователей, см. read_primary.
+    """
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or _pinned.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        writes = _writes.get()
+        if writes is not None:
+            writes.append(model)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # реплики получают схему копированием основной базы
+        return db not in settings.DATABASE_REPLICAS
+
+
+@contextmanager
+def read_primary():
+    """Направляет чтение внутри блока в основную базу."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def pin_reads_after_write(view):
+    """Ставит метку PIN_COOKIE на READ_YOUR_WRITES_SECONDS секунд,
+    если view что-то записал в базу.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _writes.set([])
+        try:
+            response = view(request, *args, **kwargs)
+            wrote = bool(_writes.get())
+        finally:
+            _writes.reset(token)
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=settings.READ_YOUR_WRITES_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+    return wrapper
+
+
+class ReadYourWritesMiddleware:
+    """Направляет чтение запросов с меткой PIN_COOKIE в основную базу."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _pinned.set(PIN_COOKIE in request.COOKIES)
+        try:
+            return self.get_response(request)
+        finally:
+            _pinned.reset(token)
@@ -0,0 +1,117 @@
+import json
+import re
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db import connections
+
+from .models import Post
+from .pagination import NEXT, POSTS_PER_PAGE, PREVIOUS
+
+# FTS5-таблица с текстами постов, её ведут триггеры из миграции
+# 0022_post_search
+TABLE = 'posts_post_fts'
+WORD_RE = re.compile(r'\w+')
+MAX_WORDS = 8
+
+
+def match_query(text):
+    """Запрос MATCH из пользовательского ввода: каждое слово ищется
+    как префикс, все слова должны встретиться. Синтаксис FTS5 из ввода
+    не используется, поэтому ввод не может сломать запрос.
+    """
+    words = WORD_RE.findall(text.lower())[:MAX_WORDS]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def encode_cursor(direction, rank, pk):
+    return urlsafe_b64encode(
+        json.dumps([direction, rank, pk], separators=(',', ':')).encode()
+    ).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Курсор (направление, rank, id) или None для первой страницы."""
+    if not token:
+        return None
+    try:
+        padding = '=' * (-len(token) % 4)
+        direction, rank, pk = json.loads(urlsafe_b64decode(token + padding))
+    except (TypeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS):
+        return None
+    if not isinstance(rank, (int, float)) or not isinstance(pk, int):
+        return None
+    return direction, rank, pk
+
+
+def filter_matching(queryset, query):
+    """Оставляет в queryset постов только подходящие под запрос."""
+    # RawSQL внутри id__in получает вторые скобки, и SQLite сравнивает
+    # id только с первой строкой подзапроса, поэтому условие в extra
+    return queryset.extra(
+        where=[
+            f'{Post._meta.db_table}.id IN '
+            f'(SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s)'
+        ],
+        params=[match_query(query)],
+    )
+
+
+def _ranked(match, cursor, limit):
+    # rank в FTS5 — bm25, чем меньше, тем релевантнее
+    sql = f'SELECT rowid, rank FROM {TABLE} WHERE {TABLE} MATCH %s'
+    params = [match]
+    order = 'rank, rowid'
+    if cursor is not None:
+        direction, rank, pk = cursor
+        if direction == NEXT:
+            sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+        else:
+            sql += ' AND (rank < %s OR (rank = %s AND rowid < %s))'
+            order = 'rank DESC, rowid DESC'
+        params += [rank, rank, pk]
+    sql += f' ORDER BY {order} LIMIT %s'
+    params.append(limit)
+    connection = connections[Post.objects.db]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+class SearchPage(list):
+    """Страница найденных постов по релевантности с курсорами
+    соседних страниц.
+    """
+    next_cursor = None
+    previous_cursor = None
+
+
+def search(query, cursor_token=None, per_page=POSTS_PER_PAGE):
+    """Страница постов по запросу через индекс FTS5.
+
+    Страницы выбираются по ключу (rank, id) без OFFSET. Посты
+    страницы читаются одним запросом вместе с авторами и группами.
+    """
+    page = SearchPage()
+    match = match_query(query)
+    if not match:
+        return page
+    cursor = decode_cursor(cursor_token)
+    rows = _ranked(match, cursor, per_page + 1)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    forward = cursor is None or cursor[0] == NEXT
+    if not forward:
+        rows.reverse()
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [pk for pk, rank in rows],
+    )
+    page.extend(posts[pk] for pk, rank in rows if pk in posts)
+    has_next = has_more if forward else True
+    has_previous = cursor is not None and (has_more or forward)
+    if rows and has_next:
+        page.next_cursor = encode_cursor(NEXT, rows[-1][1], rows[-1][0])
+    if rows and has_previous:
+        page.previous_cursor = encode_cursor(PREVIOUS, rows[0][1], rows[0][0])
+    return page
@@ -0,0 +1,168 @@
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import counters, page_cache, stats, timeline
+from .models import (Comment, Follow, Group, Post, TimelineEntry, User,
+                     UserStats)
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved_values(sender, instance, raw=False, **kwargs):
+    """Запоминает группу и картинку поста в базе до сохранения."""
+    instance._saved = None
+    if not raw and not instance._state.adding:
+        instance._saved = Post.objects.filter(pk=instance.pk).values(
+            'group_id',
+            'image',
+        ).first()
+
+
+@receiver(pre_save, sender=Post)
+def move_post_between_groups(sender, instance, raw=False, **kwargs):
+    if instance._saved is None:
+        return
+    old_group_id = instance._saved['group_id']
+    if old_group_id == instance.group_id:
+        return
+    if old_group_id is not None:
+        counters.increment([counters.group_key(old_group_id)], -1)
+        old_slug = Group.objects.filter(pk=old_group_id).values_list(
+            'slug',
+            flat=True,
+        ).first()
+        if old_slug is not None:
+            page_cache.bump([page_cache.group_scope(old_slug)])
+    if instance.group_id is not None:
+        counters.increment([counters.group_key(instance.group_id)])
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, created, raw=False, **kwargs):
+    # окончательное имя файла известно только после сохранения
+    if raw:
+        return
+    old = instance._saved['image'] if instance._saved else None
+    new = instance.image.name
+    if (old or None) == (new or None):
+        return
+    if old:
+        counters.increment([counters.image_key(old)], -1)
+    if new:
+        counters.increment([counters.image_key(new)])
+
+
+@receiver(post_save, sender=Post)
+def publish_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.increment(counters.post_keys(instance))
+        stats.adjust(instance.author_id, 'posts', 1)
+        timeline.fan_out(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def release_timeline_counters(sender, instance, **kwargs):
+    readers = TimelineEntry.objects.filter(post=instance).values_list(
+        'user_id',
+        flat=True,
+    )
+    counters.increment(
+        [counters.timeline_key(user_id) for user_id in readers],
+        -1,
+    )
+
+
+@receiver(post_delete, sender=Post)
+def release_post_counters(sender, instance, **kwargs):
+    counters.increment(counters.post_keys(instance), -1)
+    if instance.image:
+        counters.increment([counters.image_key(instance.image.name)], -1)
+    stats.adjust(instance.author_id, 'posts', -1)
+
+
+@receiver(post_delete, sender=Group)
+def drop_group_counter(sender, instance, **kwargs):
+    counters.invalidate([counters.group_key(instance.id)])
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    # у нового пользователя все счётчики нулевые
+    if created and not raw:
+        UserStats.objects.bulk_create(
+            [UserStats(user=instance)],
+            ignore_conflicts=True,
+        )
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.adjust(instance.author_id, 'followers', 1)
+        stats.adjust(instance.user_id, 'following', 1)
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    stats.adjust(instance.author_id, 'followers', -1)
+    stats.adjust(instance.user_id, 'following', -1)
+    timeline.trim(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1,
+        )
+        stats.adjust(instance.author_id, 'comments', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1,
+    )
+    stats.adjust(instance.author_id, 'comments', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        page_cache.bump(page_cache.post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_pages(sender, instance, raw=False, **kwargs):
+    post = Post.objects.select_related('group', 'author').filter(
+        pk=instance.post_id,
+    ).first()
+    if not raw and post is not None:
+        page_cache.bump(page_cache.comment_scopes(instance, post))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_profile_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    page_cache.bump(
+        page_cache.author_scope(username)
+        for username in User.objects.filter(
+            pk__in=(instance.user_id, instance.author_id),
+        ).values_list('username', flat=True)
+    )
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_pages(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        # название группы выводится в карточках всех лент
+        page_cache.bump([
+            page_cache.SITE,
+            page_cache.group_scope(instance.slug),
+        ])
@@ -0,0 +1,52 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+# поле UserStats -> (модель, поле со ссылкой на пользователя)
+SOURCES = {
+    'followers': (Follow, 'author'),
+    'following': (Follow, 'user'),
+    'posts': (Post, 'author'),
+    'comments': (Comment, 'author'),
+}
+
+
+def _exact(model, field):
+    totals = model.objects.filter(**{field: OuterRef('pk')}).order_by(
+    ).values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(totals), 0)
+
+
+def exact_stats(users):
+    """Значения полей UserStats, посчитанные по исходным таблицам."""
+    return users.annotate(**{
+        f'exact_{name}': _exact(model, field)
+        for name, (model, field) in SOURCES.items()
+    }).values_list('pk', *(f'exact_{name}' for name in SOURCES))
+
+
+def build(row):
+    user_id, *values = row
+    return UserStats(user_id=user_id, **dict(zip(SOURCES, values)))
+
+
+def get_stats(user):
+    """Счётчики пользователя из UserStats.
+
+    Если строки нет, значения считаются по исходным таблицам и не
+    сохраняются: между подсчётом и вставкой adjust() мог бы пройти мимо
+    ещё не созданной строки. Строки создаются при регистрации
+    и командой rebuild_user_stats.
+    """
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        return build(exact_stats(User.objects.filter(pk=user.pk)).get())
+
+
+def adjust(user_id, field, delta):
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    stats.update(**{field: F(field) + delta})
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import re
+import time
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+SHARDED_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+def sharded_name(name, digest):
+    """Имя файла по хэшу в двух уровнях подкаталогов из его первых
+    символов, как в media/cache у sorl: posts/ab/cd/abcd....jpg.
+    Каталоги остаются небольшими при любом числе картинок.
+    """
+    extension = os.path.splitext(name)[1].lower()
+    return os.path.join(
+        os.path.dirname(name),
+        digest[:2],
+        digest[2:4],
+        f'{digest}{extension}',
+    )
+
+
+def is_sharded(name):
+    return SHARDED_RE.search(name) is not None
+
+
+def mark_used(path):
+    """Отмечает использование файла временем доступа.
+
+    Время изменения остаётся временем записи: по нему media.serve
+    отдаёт Last-Modified, и отметки не должны сбрасывать кэш браузеров.
+    """
+    os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, называющее файлы по SHA-256 содержимого
+    в подкаталогах sharded_name.
+
+    Одинаковые картинки, загруженные несколько раз, занимают один файл
+    и делят одни миниатюры. Файлы не удаляются вместе с постами: их
+    собирает команда gc_images по счётчикам ссылок.
+    """
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        return sharded_name(name, digest.hexdigest())
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        return super().save(
+            self.content_name(name, content),
+            content,
+            max_length,
+        )
+
+    def get_available_name(self, name, max_length=None):
+        # совпадение имён означает совпадение содержимого
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            # свежее время доступа защищает файл от gc_images, пока
+            # ссылающийся на него пост не сохранён
+            mark_used(self.path(name))
+            return name
+        # запись под временным именем и атомарная замена: параллельные
+        # загрузки одного содержимого не мешают друг другу
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
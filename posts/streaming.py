@@ -0,0 +1,70 @@
+from itertools import chain
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .cards import iter_cards
+
+# Тег post_cards в потоковом режиме выводит метку вместо карточек,
+# render_feed отдаёт карточки на её месте
+CARDS_MARK = mark_safe('<!--stream:cards-->')
+
+
+class StreamingPageResponse(StreamingHttpResponse):
+    """Потоковая страница, которую можно прочитать несколько раз.
+
+    Отданные части запоминаются, и повторное чтение streaming_content
+    или content начинается с них, а затем продолжает поток. Так ответ
+    читают тестовый Client и assertContains, не ломая отдачу по частям.
+    """
+    def _set_streaming_content(self, value):
+        super()._set_streaming_content(value)
+        self._chunks = []
+
+    @property
+    def streaming_content(self):
+        return self._replay(self._chunks, self._iterator)
+
+    @streaming_content.setter
+    def streaming_content(self, value):
+        self._set_streaming_content(value)
+
+    def _replay(self, chunks, iterator):
+        index = 0
+        while True:
+            if index == len(chunks):
+                chunk = next(iterator, None)
+                if chunk is None:
+                    return
+                chunks.append(self.make_bytes(chunk))
+            yield chunks[index]
+            index += 1
+
+    @property
+    def content(self):
+        return b''.join(self.streaming_content)
+
+
+def render_feed(request, template_name, context):
+    """render() для лент, отдающий страницу по частям.
+
+    Шаблон страницы рендерится сразу, кроме карточек постов: вместо них
+    тег post_cards выводит CARDS_MARK. Поэтому context доступен
+    тестовому Client, а head и навигация уходят клиенту до рендеринга
+    карточек. Кэш карточек и миниатюры тоже читаются в рамках запроса,
+    по мере отдачи рендерятся только карточки, которых нет в кэше;
+    PerformanceMiddleware учитывает их в бюджете view.
+    """
+    if not settings.STREAM_FEEDS:
+        return render(request, template_name, context)
+    cards = iter_cards(context['page'], request.user)
+    html = render_to_string(
+        template_name,
+        {**context, 'stream_cards': True},
+        request,
+    )
+    head, _, tail = html.partition(CARDS_MARK)
+    return StreamingPageResponse(chain([head], cards, [tail]))
@@ -0,0 +1,14 @@
+from django import template
+
+from posts.cards import render_cards
+from posts.streaming import CARDS_MARK
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, page):
+    if context.get('stream_cards'):
+        # карточки отдаёт posts.streaming.render_feed на месте метки
+        return [CARDS_MARK]
+    return render_cards(page, context['user'])
@@ -0,0 +1,41 @@
+from django import template
+from django.conf import settings
+
+from posts import thumbnails
+
+register = template.Library()
+
+# карточка занимает всю ширину колонки, но не шире 960px
+CARD_SIZES = '(max-width: 960px) 100vw, 960px'
+
+
+@register.simple_tag
+def post_thumbnail(post, size=thumbnails.CARD):
+    return thumbnails.for_post(post, size)
+
+
+@register.inclusion_tag('post_picture.html')
+def post_picture(post, image):
+    """<picture> карточки: варианты в WebP и других форматах через
+    <source>, JPEG через srcset самого <img>. Пока миниатюры нет,
+    выводится блок в пропорциях карточки с заглушкой картинки.
+    """
+    width, height = thumbnails.card_size()
+    context = {
+        'image': image,
+        'placeholder': post.image_placeholder,
+        'ratio': round(height / width * 100, 1),
+    }
+    if image is None:
+        return context
+    sources = []
+    for image_format in settings.CARD_IMAGE_FORMATS:
+        srcset = thumbnails.srcset(post, image_format)
+        if image_format != 'JPEG' and srcset:
+            sources.append((f'image/{image_format.lower()}', srcset))
+    return {
+        **context,
+        'sources': sources,
+        'srcset': thumbnails.srcset(post, 'JPEG'),
+        'sizes': CARD_SIZES,
+    }
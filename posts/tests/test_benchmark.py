@@ -0,0 +1,47 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Comment, Follow
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BenchmarkTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_all_routes_are_measured(self):
+        """Бенчмарк проходит все маршруты, включая потоковые ленты"""
+        call_command(
+            'generate_data',
+            users=5,
+            posts=20,
+            groups=2,
+            comments=10,
+            images=1,
+            stdout=StringIO(),
+        )
+        comments = Comment.objects.count()
+        follows = set(Follow.objects.values_list('user_id', 'author_id'))
+        stdout = StringIO()
+        # миниатюры не создаются в фоне после удаления MEDIA_ROOT
+        with mock.patch('posts.thumbnails._submit'):
+            call_command('benchmark', iterations=1, warmup=0, stdout=stdout)
+        output = stdout.getvalue()
+        for route in ('index', 'follow_index', 'profile:anonymous'):
+            self.assertIn(route, output)
+        # созданные замером записи удалены
+        self.assertEqual(Comment.objects.count(), comments)
+        self.assertEqual(
+            set(Follow.objects.values_list('user_id', 'author_id')),
+            follows,
+        )
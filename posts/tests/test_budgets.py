@@ -0,0 +1,174 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.performance import capture_requests
+
+USERNAME = 'testuser'
+AUTHOR_USERNAME = 'author'
+GROUP_SLUG = 'test_slug_post'
+POSTS_COUNT = 13
+COMMENTERS_COUNT = 5
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def uploaded_image(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name='upload.png', content=buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ViewBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+        cls.author = User.objects.create(username=AUTHOR_USERNAME)
+        cls.group = Group.objects.create(
+            title='test title post',
+            slug=GROUP_SLUG,
+            description='test description post',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for number in range(POSTS_COUNT):
+            post = Post.objects.create(
+                text=f'test text {number}',
+                author=cls.author,
+                group=cls.group,
+            )
+            Comment.objects.create(post=post, author=cls.user, text='c')
+        cls.post = post
+        for number in range(COMMENTERS_COUNT):
+            commenter = User.objects.create(username=f'commenter{number}')
+            Comment.objects.create(post=post, author=commenter, text='c')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def assertWithinBudget(self, client, url, method='get', data=None):
+        with capture_requests() as captured:
+            response = getattr(client, method)(url, data)
+            # потоковое тело измеряется по мере чтения
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(len(captured), 1)
+        metrics = captured[0]
+        self.assertIsNotNone(metrics.budget(), metrics.url_name)
+        # время зависит от машины, его превышение только пишется в лог
+        self.assertEqual(metrics.violations(timing=False), [])
+
+    def test_pages_are_within_budget(self):
+        """Страницы укладываются в бюджет на холодном кэше
+        """
+        post_args = (AUTHOR_USERNAME, self.post.id)
+        urls = (
+            reverse('index'),
+            reverse('group', args=(GROUP_SLUG,)),
+            reverse('profile', args=(AUTHOR_USERNAME,)),
+            reverse('post', args=post_args),
+            reverse('follow_index'),
+            reverse('new_post'),
+            reverse('search') + '?q=test',
+        )
+        for client in (self.guest_client, self.authorized_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    cache.clear()
+                    self.assertWithinBudget(client, url)
+        self.assertWithinBudget(
+            self.author_client,
+            reverse('post_edit', args=post_args),
+        )
+
+    def test_actions_are_within_budget(self):
+        """Действия пользователя укладываются в бюджет
+        """
+        post_args = (AUTHOR_USERNAME, self.post.id)
+        self.assertWithinBudget(
+            self.author_client,
+            reverse('new_post'),
+            'post',
+            {
+                'text': 'new text',
+                'group': self.group.id,
+                'image': uploaded_image('green'),
+            },
+        )
+        self.assertWithinBudget(
+            self.author_client,
+            reverse('post_edit', args=post_args),
+            'post',
+            {'text': 'edited text', 'group': self.group.id},
+        )
+        self.assertWithinBudget(
+            self.authorized_client,
+            reverse('add_comment', args=post_args),
+            'post',
+            {'text': 'comment'},
+        )
+        self.assertWithinBudget(
+            self.authorized_client,
+            reverse('profile_unfollow', args=(AUTHOR_USERNAME,)),
+        )
+        self.assertWithinBudget(
+            self.authorized_client,
+            reverse('profile_follow', args=(AUTHOR_USERNAME,)),
+        )
+
+    def test_image_edit_is_within_budget(self):
+        """Правка поста с заменой картинки и переносом в другую группу
+        укладывается в бюджет
+        """
+        url = reverse('post_edit', args=(AUTHOR_USERNAME, self.post.id))
+        self.author_client.post(url, {
+            'text': 'edited text',
+            'group': self.group.id,
+            'image': uploaded_image('red'),
+        })
+        other_group = Group.objects.create(
+            title='other title',
+            slug='other_slug',
+            description='other description',
+        )
+        self.assertWithinBudget(self.author_client, url, 'post', {
+            'text': 'edited again',
+            'group': other_group.id,
+            'image': uploaded_image('blue'),
+        })
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_pull_author_feed_is_within_budget(self):
+        """Лента с постами популярных авторов укладывается в бюджет
+        """
+        self.assertWithinBudget(
+            self.authorized_client,
+            reverse('follow_index'),
+        )
+
+    @override_settings(VIEW_BUDGETS={'index': {'queries': 0, 'time': 0}})
+    def test_exceeded_budget_is_logged(self):
+        """Превышение бюджета попадает в лог posts.performance
+        """
+        with self.assertLogs('posts.performance', 'WARNING') as logs:
+            self.guest_client.get(reverse('index'))
+        self.assertIn('index', logs.output[0])
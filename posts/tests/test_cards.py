@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+USERNAME = 'testuser'
+READER_USERNAME = 'reader'
+POST_TEXT = 'test text'
+
+URL_FOR_INDEX = reverse('index')
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+        cls.reader = User.objects.create(username=READER_USERNAME)
+        cls.group = Group.objects.create(
+            title='test title post',
+            slug='test_slug_post',
+            description='test description post',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text=POST_TEXT,
+            author=self.user,
+            group=self.group,
+        )
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.URL_FOR_POST_EDIT = reverse(
+            'post_edit',
+            args=(USERNAME, self.post.id),
+        )
+
+    def test_viewer_parts_are_patched_into_cached_card(self):
+        """Кнопка редактирования и подпись кнопки комментариев
+        подставляются для каждого зрителя
+        """
+        author_response = self.author_client.get(URL_FOR_INDEX)
+        reader_response = self.reader_client.get(URL_FOR_INDEX)
+        guest_response = Client().get(URL_FOR_INDEX)
+        self.assertContains(author_response, self.URL_FOR_POST_EDIT)
+        self.assertNotContains(reader_response, self.URL_FOR_POST_EDIT)
+        self.assertContains(reader_response, 'Добавить комментарий')
+        self.assertContains(guest_response, 'Комментарии')
+        self.assertNotContains(guest_response, 'Добавить комментарий')
+
+    def test_card_is_rendered_again_after_changes(self):
+        """Карточка перерисовывается после правки, комментария
+        и переименования группы
+        """
+        self.reader_client.get(URL_FOR_INDEX)
+        Post.objects.filter(pk=self.post.pk).update(text='edited text')
+        self.assertContains(self.reader_client.get(URL_FOR_INDEX), 'edited')
+        Comment.objects.create(post=self.post, author=self.reader, text='c')
+        self.assertContains(
+            self.reader_client.get(URL_FOR_INDEX),
+            'Комментариев: 1',
+        )
+        self.group.title = 'renamed group'
+        self.group.save()
+        self.assertContains(
+            self.reader_client.get(URL_FOR_INDEX),
+            'renamed group',
+        )
+
+    def test_cached_cards_are_not_rendered_again(self):
+        """Повторный вывод страницы берёт карточки из кэша
+        """
+        self.reader_client.get(URL_FOR_INDEX)
+        response = self.reader_client.get(URL_FOR_INDEX)
+        self.assertNotIn(
+            'post_item.html',
+            [template.name for template in response.templates],
+        )
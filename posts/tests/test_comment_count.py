@@ -0,0 +1,57 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+
+USERNAME = 'testuser'
+POST_TEXT = 'test text'
+
+
+class CommentCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+
+    def setUp(self):
+        self.post = Post.objects.create(text=POST_TEXT, author=self.user)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_comment_count_follows_comments(self):
+        """Счётчик комментариев растёт при добавлении и падает
+        при удалении комментария
+        """
+        self.authorized_client.post(
+            reverse('add_comment', args=(USERNAME, self.post.id)),
+            data={'text': 'comment'},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        Comment.objects.get().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_index_does_not_query_comments(self):
+        """Карточки ленты не обращаются к таблице комментариев
+        """
+        Comment.objects.create(post=self.post, author=self.user, text='c')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, 'Комментариев: 1')
+        for query in queries.captured_queries:
+            self.assertNotIn('posts_comment', query['sql'])
+
+    def test_repair_comment_counts(self):
+        """Команда repair_comment_counts исправляет расхождения
+        """
+        Comment.objects.create(post=self.post, author=self.user, text='c')
+        Post.objects.update(comment_count=5)
+        call_command('repair_comment_counts', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
@@ -0,0 +1,97 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import counters, timeline
+from posts.models import Counter, Follow, Group, Post, User
+
+USERNAME = 'testuser'
+GROUP_SLUG = 'test_slug_post'
+POST_TEXT = 'test text'
+
+URL_FOR_INDEX = reverse('index')
+URL_FOR_GROUP = reverse('group', args=(GROUP_SLUG,))
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+        cls.group = Group.objects.create(
+            title='test title post',
+            slug=GROUP_SLUG,
+            description='test description post',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def counter(self, name):
+        return Counter.objects.get(name=name).value
+
+    def test_paginator_reads_total_from_counter(self):
+        """Пагинатор берёт общее число записей из счётчика
+        """
+        Post.objects.create(text=POST_TEXT, author=self.user)
+        Counter.objects.create(name=counters.POSTS, value=42)
+        cache.clear()
+        response = self.guest_client.get(URL_FOR_INDEX)
+        self.assertEqual(response.context['paginator'].count, 42)
+
+    def test_counters_follow_post_changes(self):
+        """Счётчики меняются при создании, переносе и удалении записи
+        """
+        Post.objects.create(text=POST_TEXT, author=self.user)
+        call_command('reconcile_counters', stdout=StringIO())
+        post = Post.objects.create(
+            text=POST_TEXT,
+            author=self.user,
+            group=self.group,
+        )
+        self.assertEqual(self.counter(counters.POSTS), 2)
+        self.assertEqual(self.counter(counters.group_key(self.group.id)), 1)
+        post.group = None
+        post.save()
+        self.assertEqual(self.counter(counters.group_key(self.group.id)), 0)
+        post.delete()
+        self.assertEqual(self.counter(counters.POSTS), 1)
+
+    def test_reading_does_not_create_counters(self):
+        """Без счётчика лента считает точный COUNT и не создаёт его
+        """
+        Post.objects.create(text=POST_TEXT, author=self.user)
+        cache.clear()
+        response = self.guest_client.get(URL_FOR_INDEX)
+        self.assertEqual(response.context['paginator'].count, 1)
+        self.assertFalse(Counter.objects.exists())
+
+    def test_fan_out_counts_only_new_entries(self):
+        """Запись, уже попавшая в ленту, не увеличивает её счётчик
+        """
+        reader = User.objects.create(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        post = Post.objects.create(text=POST_TEXT, author=self.user)
+        call_command('reconcile_counters', stdout=StringIO())
+        timeline.fan_out(post)
+        self.assertEqual(self.counter(counters.timeline_key(reader.id)), 1)
+
+    def test_reconcile_counters_fixes_drift(self):
+        """Команда reconcile_counters исправляет расхождения
+        """
+        Post.objects.create(
+            text=POST_TEXT,
+            author=self.user,
+            group=self.group,
+        )
+        Counter.objects.create(name=counters.POSTS, value=7)
+        Counter.objects.create(
+            name=counters.group_key(self.group.id),
+            value=0,
+        )
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.counter(counters.POSTS), 1)
+        self.assertEqual(self.counter(counters.group_key(self.group.id)), 1)
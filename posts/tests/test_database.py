@@ -0,0 +1,96 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post, User
+from posts.storage import ContentAddressedStorage
+from yatube.sqlite3.base import PRAGMAS
+
+SYNCHRONOUS_NORMAL = 1
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class SQLiteBackendTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connection_pragmas(self):
+        """Соединение настроено PRAGMA бэкенда yatube.sqlite3
+        """
+        self.assertEqual(self.pragma('synchronous'), SYNCHRONOUS_NORMAL)
+        self.assertEqual(
+            self.pragma('busy_timeout'),
+            PRAGMAS['busy_timeout'],
+        )
+        self.assertEqual(self.pragma('cache_size'), PRAGMAS['cache_size'])
+
+    def test_pragmas_are_configurable(self):
+        """OPTIONS['pragmas'] переопределяет PRAGMA по умолчанию
+        и не передаётся в sqlite3.connect
+        """
+        options = connection.settings_dict['OPTIONS']
+        options['pragmas'] = {'busy_timeout': 100}
+        self.addCleanup(options.pop, 'pragmas')
+        self.assertEqual(connection.pragmas()['busy_timeout'], 100)
+        self.assertNotIn('pragmas', connection.get_connection_params())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ViewTransactionTests(TransactionTestCase):
+    """Блокировка записи SQLite берётся только на время записи в базу"""
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_form_is_rendered_without_transaction(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('new_post'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([
+            query for query in context.captured_queries
+            if query['sql'].startswith('BEGIN')
+        ])
+
+    def test_image_is_stored_outside_transaction(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 30), 'red').save(buffer, 'JPEG')
+        image = SimpleUploadedFile(
+            'red.jpg',
+            buffer.getvalue(),
+            content_type='image/jpeg',
+        )
+        in_transaction = []
+        save = ContentAddressedStorage._save
+
+        def record(storage, name, content):
+            in_transaction.append(connection.in_atomic_block)
+            return save(storage, name, content)
+
+        # после настоящей фиксации миниатюры создавались бы в фоне,
+        # пока тест очищает базу
+        with mock.patch.object(ContentAddressedStorage, '_save', record), \
+                mock.patch('posts.thumbnails._submit'):
+            self.client.post(
+                reverse('new_post'),
+                {'text': 'С картинкой', 'image': image},
+            )
+        self.assertEqual(in_transaction, [False])
+        self.assertTrue(Post.objects.get().image)
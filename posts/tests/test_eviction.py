@@ -0,0 +1,98 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from posts import thumbnails
+from posts.models import Post, User
+
+USERNAME = 'testuser'
+DAY = 60 * 60 * 24
+
+URL_FOR_INDEX = reverse('index')
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def uploaded_image(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name='upload.png', content=buffer.getvalue())
+
+
+def thumbnail_paths(post):
+    post = Post.objects.get(pk=post.pk)
+    return [
+        default.storage.path(thumbnail.name)
+        for thumbnail in (
+            thumbnails.for_post(post, size) for size in thumbnails.sizes()
+        )
+        if thumbnail is not None
+    ]
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailEvictionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.old = Post.objects.create(
+            text='old',
+            author=self.user,
+            image=uploaded_image('red'),
+        )
+        self.fresh = Post.objects.create(
+            text='fresh',
+            author=self.user,
+            image=uploaded_image('blue'),
+        )
+        for post in (self.old, self.fresh):
+            thumbnails.generate(post.image.name)
+        self.old_paths = thumbnail_paths(self.old)
+        self.fresh_paths = thumbnail_paths(self.fresh)
+        past = time.time() - DAY * 30
+        for path in self.old_paths:
+            os.utime(path, (past, past))
+        cache.clear()
+
+    def test_least_recently_used_thumbnails_are_evicted(self):
+        """Вытесняются давно не показанные миниатюры вместе с записями
+        KVStore, пока каталог не уложится в бюджет
+        """
+        budget = sum(os.path.getsize(path) for path in self.fresh_paths)
+        call_command(
+            'evict_thumbnails',
+            max_bytes=budget,
+            stdout=io.StringIO(),
+        )
+        self.assertFalse(any(map(os.path.exists, self.old_paths)))
+        self.assertTrue(all(map(os.path.exists, self.fresh_paths)))
+        self.assertEqual(thumbnail_paths(self.old), [])
+
+    def test_shown_thumbnails_are_touched(self):
+        """Показ карточки обновляет время использования миниатюр
+        """
+        Client().get(URL_FOR_INDEX)
+        for path in self.old_paths:
+            self.assertGreater(os.path.getatime(path), time.time() - DAY)
+            # время изменения отдаётся браузерам в Last-Modified
+            self.assertLess(os.path.getmtime(path), time.time() - DAY)
@@ -0,0 +1,58 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Comment, Group, Post, User
+from posts.storage import is_sharded
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+OPTIONS = {
+    'users': 5,
+    'posts': 20,
+    'groups': 2,
+    'comments': 10,
+    'images': 1,
+    'stdout': StringIO(),
+}
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class GenerateDataTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_dates_are_spread(self):
+        """Даты постов разбросаны по --days дням, комментарии не старше
+        своих постов
+        """
+        call_command('generate_data', days=30, **OPTIONS)
+        dates = list(Post.objects.values_list('pub_date', flat=True))
+        self.assertEqual(len(set(dates)), len(dates))
+        self.assertGreater((max(dates) - min(dates)).days, 1)
+        for comment in Comment.objects.select_related('post'):
+            self.assertGreaterEqual(comment.created, comment.post.pub_date)
+
+    def test_rerun_with_same_prefix_adds_posts(self):
+        """Повторный запуск с тем же префиксом не падает на занятых
+        именах и добавляет посты
+        """
+        call_command('generate_data', **OPTIONS)
+        call_command('generate_data', **OPTIONS)
+        self.assertEqual(User.objects.count(), OPTIONS['users'])
+        self.assertEqual(Group.objects.count(), OPTIONS['groups'])
+        self.assertEqual(Post.objects.count(), OPTIONS['posts'] * 2)
+
+    def test_images_use_post_storage(self):
+        """Картинки сохраняются хранилищем Post.image с именами по хэшу
+        """
+        call_command('generate_data', image_ratio=1, **OPTIONS)
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertTrue(all(is_sharded(name) for name in names))
@@ -0,0 +1,120 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post, User
+
+USERNAME = 'testuser'
+EXIF_ORIENTATION = 0x0112
+# поворот на 90° по часовой стрелке при показе
+ROTATED = 6
+
+URL_FOR_NEW_POST = reverse('new_post')
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def uploaded_image(size, image_format, mode='RGB', exif=None):
+    buffer = io.BytesIO()
+    image = Image.new(mode, size, 'red')
+    extra = {'exif': exif.tobytes()} if exif is not None else {}
+    image.save(buffer, image_format, **extra)
+    return SimpleUploadedFile(
+        name=f'upload.{image_format.lower()}',
+        content=buffer.getvalue(),
+        content_type=f'image/{image_format.lower()}',
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, UPLOAD_IMAGE_MAX_SIZE=100)
+class UploadNormalizationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, image):
+        self.authorized_client.post(
+            URL_FOR_NEW_POST,
+            {'text': 'test text', 'image': image},
+        )
+        return Post.objects.get()
+
+    def test_large_photo_is_downscaled_and_stripped(self):
+        """Фото уменьшается, поворачивается по EXIF, метаданные
+        удаляются, размеры сохраняются в посте
+        """
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = ROTATED
+        post = self.upload(uploaded_image((400, 300), 'JPEG', exif=exif))
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertEqual((post.image_width, post.image_height), (75, 100))
+        with Image.open(post.image) as stored:
+            self.assertEqual(stored.size, (75, 100))
+            self.assertNotIn('exif', stored.info)
+
+    def test_broken_image_is_form_error(self):
+        """Картинка, которую не удалось декодировать, даёт ошибку формы,
+        а не ошибку сервера
+        """
+        buffer = io.BytesIO()
+        Image.effect_noise((400, 300), 64).convert('RGB').save(
+            buffer,
+            'JPEG',
+        )
+        # заголовок цел, и проверка ImageField проходит, но пикселей
+        # не хватает
+        truncated = SimpleUploadedFile(
+            name='upload.jpeg',
+            content=buffer.getvalue()[:len(buffer.getvalue()) // 2],
+            content_type='image/jpeg',
+        )
+        response = self.authorized_client.post(
+            URL_FOR_NEW_POST,
+            {'text': 'test text', 'image': truncated},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response,
+            'form',
+            'image',
+            'Не удалось обработать картинку: файл повреждён '
+            'или слишком велик',
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_transparent_image_stays_png(self):
+        """Картинка с прозрачностью сохраняется в PNG
+        """
+        post = self.upload(uploaded_image((50, 40), 'PNG', mode='RGBA'))
+        self.assertTrue(post.image.name.endswith('.png'))
+        self.assertEqual((post.image_width, post.image_height), (50, 40))
+        with Image.open(post.image) as stored:
+            self.assertEqual(stored.mode, 'RGBA')
+
+    def test_upload_stores_placeholder(self):
+        """При загрузке сохраняется заглушка, и карточка выводит её
+        на месте ещё не готовой миниатюры
+        """
+        post = self.upload(uploaded_image((400, 300), 'JPEG'))
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,'),
+        )
+        self.assertLess(len(post.image_placeholder), 1024)
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, post.image_placeholder)
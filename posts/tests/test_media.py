@@ -0,0 +1,178 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.storage import mark_used
+from users.forms import CreationForm
+
+CONTENT = b'0123456789'
+FILE_NAME = 'posts/file.jpg'
+QUOTED_FILE_NAME = 'posts/файл 1.jpg'
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+URL_FOR_FILE = reverse('media', args=(FILE_NAME,))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaServeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(MEDIA_ROOT, 'posts'), exist_ok=True)
+        for name in (FILE_NAME, QUOTED_FILE_NAME):
+            with open(os.path.join(MEDIA_ROOT, name), 'wb') as file:
+                file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_file_is_served_with_validators(self):
+        """Файл отдаётся целиком с ETag, Last-Modified и Accept-Ranges
+        """
+        response = self.client.get(URL_FOR_FILE)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_conditional_requests_get_not_modified(self):
+        """If-None-Match и If-Modified-Since дают 304 без тела
+        """
+        response = self.client.get(URL_FOR_FILE)
+        for headers in (
+            {'HTTP_IF_NONE_MATCH': response['ETag']},
+            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+        ):
+            with self.subTest(headers=headers):
+                cached = self.client.get(URL_FOR_FILE, **headers)
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached.content, b'')
+
+    def test_validators_survive_use(self):
+        """Отметка использования файла не меняет ETag и Last-Modified
+        """
+        response = self.client.get(URL_FOR_FILE)
+        mark_used(os.path.join(MEDIA_ROOT, FILE_NAME))
+        cached = self.client.get(
+            URL_FOR_FILE,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['Last-Modified'], response['Last-Modified'])
+
+    def test_byte_ranges(self):
+        """Range отдаёт часть файла, невыполнимый диапазон — 416
+        """
+        cases = (
+            ('bytes=2-5', 206, b'2345', 'bytes 2-5/10'),
+            ('bytes=7-', 206, b'789', 'bytes 7-9/10'),
+            ('bytes=-3', 206, b'789', 'bytes 7-9/10'),
+            ('bytes=20-', 416, b'', 'bytes */10'),
+        )
+        for header, status, content, content_range in cases:
+            with self.subTest(range=header):
+                response = self.client.get(URL_FOR_FILE, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(response['Content-Range'], content_range)
+                body = (
+                    b''.join(response.streaming_content)
+                    if response.streaming else response.content
+                )
+                self.assertEqual(body, content)
+
+    def test_stale_if_range_gets_whole_file(self):
+        """Range с устаревшим If-Range отдаёт файл целиком
+        """
+        response = self.client.get(
+            URL_FOR_FILE,
+            HTTP_RANGE='bytes=2-5',
+            HTTP_IF_RANGE='"stale"',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+    def test_rewritten_file_gets_new_etag(self):
+        """Другое содержимое того же размера под прежним именем
+        получает новый ETag, и If-Range со старым отдаёт файл целиком
+        """
+        name = 'posts/rewritten.jpg'
+        path = os.path.join(MEDIA_ROOT, name)
+        url = reverse('media', args=(name,))
+        with open(path, 'wb') as file:
+            file.write(CONTENT)
+        response = self.client.get(url)
+        stat = os.stat(path)
+        with open(path, 'wb') as file:
+            file.write(CONTENT[::-1])
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        ranged = self.client.get(
+            url,
+            HTTP_RANGE='bytes=2-5',
+            HTTP_IF_RANGE=response['ETag'],
+        )
+        self.assertEqual(ranged.status_code, 200)
+        self.assertNotEqual(ranged['ETag'], response['ETag'])
+        self.assertEqual(b''.join(ranged.streaming_content), CONTENT[::-1])
+
+    def test_invalid_range_gets_whole_file(self):
+        """Неверный диапазон, в котором начало больше конца,
+        игнорируется
+        """
+        response = self.client.get(URL_FOR_FILE, HTTP_RANGE='bytes=5-2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/')
+    def test_accel_redirect_hands_off_to_proxy(self):
+        """С MEDIA_ACCEL_REDIRECT тело отдаёт nginx
+        """
+        response = self.client.get(URL_FOR_FILE)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/' + FILE_NAME,
+        )
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/')
+    def test_accel_redirect_quotes_path(self):
+        """Путь в X-Accel-Redirect экранируется
+        """
+        response = self.client.get(reverse('media', args=(QUOTED_FILE_NAME,)))
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/posts/%D1%84%D0%B0%D0%B9%D0%BB%201.jpg',
+        )
+
+    def test_paths_outside_media_root_are_not_found(self):
+        """Пути вне MEDIA_ROOT и каталоги не отдаются
+        """
+        for path in ('../manage.py', 'posts/', 'posts/missing.jpg'):
+            with self.subTest(path=path):
+                response = self.client.get(settings.MEDIA_URL + path)
+                self.assertEqual(response.status_code, 404)
+
+
+class ReservedUsernameTests(TestCase):
+    def test_media_username_is_rejected(self):
+        """Нельзя зарегистрировать имя, посты которого открывали бы media
+        """
+        for username, valid in (('media', False), ('mediator', True)):
+            with self.subTest(username=username):
+                form = CreationForm(data={
+                    'username': username,
+                    'password1': 'Zx9-long-password',
+                    'password2': 'Zx9-long-password',
+                })
+                self.assertEqual(form.is_valid(), valid)
@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+USERNAME = 'testuser'
+FOLLOWER_USERNAME = 'follower'
+GROUP_SLUG = 'test_slug_post'
+POST_TEXT = 'test text'
+
+URL_FOR_INDEX = reverse('index')
+URL_FOR_GROUP = reverse('group', args=(GROUP_SLUG,))
+URL_FOR_PROFILE = reverse('profile', args=(USERNAME,))
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+        cls.follower = User.objects.create(username=FOLLOWER_USERNAME)
+        cls.group = Group.objects.create(
+            title='test title post',
+            slug=GROUP_SLUG,
+            description='test description post',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text=POST_TEXT,
+            author=self.user,
+            group=self.group,
+        )
+        self.guest_client = Client()
+
+    def assertServedFromCache(self, url):
+        self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def assertRenderedAgain(self, url):
+        response = self.guest_client.get(url)
+        self.assertIsNotNone(response.context)
+
+    def test_feeds_are_served_from_cache(self):
+        """Повторный анонимный запрос ленты не обращается к базе
+        """
+        for url in (URL_FOR_INDEX, URL_FOR_GROUP, URL_FOR_PROFILE):
+            with self.subTest(url=url):
+                self.assertServedFromCache(url)
+
+    def test_comment_invalidates_feeds_of_post(self):
+        """Комментарий сбрасывает ленты, в которых есть пост
+        """
+        for url in (URL_FOR_INDEX, URL_FOR_GROUP, URL_FOR_PROFILE):
+            self.assertServedFromCache(url)
+        Comment.objects.create(post=self.post, author=self.follower, text='c')
+        for url in (URL_FOR_INDEX, URL_FOR_GROUP, URL_FOR_PROFILE):
+            with self.subTest(url=url):
+                self.assertRenderedAgain(url)
+
+    def test_follow_invalidates_profile_only(self):
+        """Подписка сбрасывает профиль, но не общую ленту
+        """
+        self.assertServedFromCache(URL_FOR_INDEX)
+        self.assertServedFromCache(URL_FOR_PROFILE)
+        Follow.objects.create(user=self.follower, author=self.user)
+        self.assertRenderedAgain(URL_FOR_PROFILE)
+        self.assertServedFromCache(URL_FOR_INDEX)
+
+    def test_authorized_user_is_not_served_from_cache(self):
+        """Авторизованный пользователь получает свежую страницу
+        """
+        self.assertServedFromCache(URL_FOR_INDEX)
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        response = authorized_client.get(URL_FOR_INDEX)
+        self.assertIsNotNone(response.context)
+
+    def test_comment_invalidates_commenter_profile(self):
+        """Комментарий сбрасывает профиль комментатора
+        """
+        url = reverse('profile', args=(FOLLOWER_USERNAME,))
+        self.assertServedFromCache(url)
+        Comment.objects.create(post=self.post, author=self.follower, text='c')
+        self.assertRenderedAgain(url)
+
+    def test_page_cached_before_commit_is_dropped(self):
+        """Страница, закэшированная до фиксации записи, сбрасывается
+        после фиксации
+        """
+        on_commit = []
+        with mock.patch(
+            'posts.page_cache.transaction.on_commit',
+            on_commit.append,
+        ):
+            Comment.objects.create(
+                post=self.post,
+                author=self.follower,
+                text='c',
+            )
+        # запрос до фиксации кладёт страницу под новым поколением
+        self.assertServedFromCache(URL_FOR_INDEX)
+        for callback in on_commit:
+            callback()
+        self.assertRenderedAgain(URL_FOR_INDEX)
@@ -113,3 +113,62 @@ class PaginatorViewsTest(TestCase):
             posts_list.append(posts)
         response = self.guest_client.get(URL_FOR_GROUP_SECOND_PAGE)
         self.assertEqual(len(response.context['page']), 3)
+
+    def test_cursor_pages_follow_each_other(self):
+        """Курсорные ссылки ведут на соседние страницы без пропусков
+        """
+        for count in range(0, 13):
+            Post.objects.create(
+                text=(f'test text {count}'),
+                author=self.user,
+                group=self.group,
+            )
+        first_page = self.guest_client.get(URL_FOR_INDEX).context['page']
+        second_page = self.guest_client.get(
+            URL_FOR_INDEX + '?cursor=' + first_page.next_cursor
+        ).context['page']
+        back_page = self.guest_client.get(
+            URL_FOR_INDEX + '?cursor=' + second_page.previous_cursor
+        ).context['page']
+        self.assertEqual(len(second_page), 3)
+        self.assertEqual(second_page.number, 2)
+        self.assertIsNone(second_page.next_cursor)
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertEqual(back_page.number, 1)
+        self.assertEqual(
+            set(first_page) | set(second_page),
+            set(Post.objects.all()),
+        )
+
+    def test_cursor_page_is_stable_after_new_post(self):
+        """Новая запись не сдвигает страницу, открытую по курсору
+        """
+        for count in range(0, 13):
+            Post.objects.create(
+                text=(f'test text {count}'),
+                author=self.user,
+                group=self.group,
+            )
+        first_page = self.guest_client.get(URL_FOR_GROUP).context['page']
+        Post.objects.create(
+            text='fresh text',
+            author=self.user,
+            group=self.group,
+        )
+        second_page = self.guest_client.get(
+            URL_FOR_GROUP + '?cursor=' + first_page.next_cursor
+        ).context['page']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(set(first_page) & set(second_page))
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        """Испорченный курсор открывает первую страницу
+        """
+        Post.objects.create(
+            text=POST_TEXT,
+            author=self.user,
+            group=self.group,
+        )
+        response = self.guest_client.get(URL_FOR_INDEX + '?cursor=broken')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page']), 1)
@@ -0,0 +1,124 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+USERNAME = 'testuser'
+READER_USERNAME = 'reader'
+GROUP_SLUG = 'test_slug_post'
+POSTS_COUNT = 25
+
+# строки EXPLAIN QUERY PLAN, означающие полный проход по таблице
+# или сортировку во временном B-дереве
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)$')
+TEMP_SORT = re.compile(r'USE TEMP B-TREE')
+# формы записи выводят все группы, полный проход здесь ожидаем
+ALLOWED_SCANS = {
+    'new_post': {'posts_group'},
+    'post_edit': {'posts_group'},
+}
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class QueryPlanTests(TestCase):
+    """Запросы каждой страницы из posts/urls.py проверяются через
+    EXPLAIN QUERY PLAN: ленты не должны сканировать таблицы целиком
+    и сортировать записи без индекса.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=USERNAME)
+        cls.reader = User.objects.create(username=READER_USERNAME)
+        cls.group = Group.objects.create(
+            title='test title post',
+            slug=GROUP_SLUG,
+            description='test description post',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for number in range(POSTS_COUNT):
+            cls.post = Post.objects.create(
+                text=f'test text {number}',
+                author=cls.user,
+                group=cls.group,
+            )
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.reader,
+                text='comment',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed_urls(self):
+        post_args = (USERNAME, self.post.id)
+        return [
+            reverse('index'),
+            reverse('group', args=(GROUP_SLUG,)),
+            reverse('follow_index'),
+            reverse('profile', args=(USERNAME,)),
+            reverse('post', args=post_args),
+            reverse('add_comment', args=post_args),
+            reverse('new_post'),
+            reverse('post_edit', args=post_args),
+            reverse('index') + '?page=2',
+            reverse('profile', args=(USERNAME,)) + '?page=3',
+        ]
+
+    def cursor_urls(self):
+        urls = []
+        for url in (
+            reverse('index'),
+            reverse('group', args=(GROUP_SLUG,)),
+            reverse('follow_index'),
+            reverse('profile', args=(USERNAME,)),
+        ):
+            page = self.client.get(url).context['page']
+            urls.append(url + '?cursor=' + page.next_cursor)
+            next_page = self.client.get(urls[-1]).context['page']
+            urls.append(url + '?cursor=' + next_page.previous_cursor)
+        return urls
+
+    def assertIndexedPlans(self, url, client):
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        url_name = resolve(url.split('?')[0]).url_name
+        allowed = ALLOWED_SCANS.get(url_name, set())
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for detail in query_plan(sql):
+                with self.subTest(url=url, sql=sql, plan=detail):
+                    scan = FULL_SCAN.match(detail)
+                    if scan is not None:
+                        self.assertIn(scan.group('table'), allowed)
+                    self.assertIsNone(TEMP_SORT.search(detail))
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы страниц используют индексы без сортировки в памяти
+        """
+        author_client = Client()
+        author_client.force_login(self.user)
+        for client in (self.client, author_client, Client()):
+            for url in self.feed_urls():
+                self.assertIndexedPlans(url, client)
+
+    def test_cursor_queries_use_indexes(self):
+        """Переход по курсору использует индексы без сортировки в памяти
+        """
+        for url in self.cursor_urls():
+            self.assertIndexedPlans(url, self.client)
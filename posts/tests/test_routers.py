@@ -0,0 +1,79 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.page_cache import cache_anonymous_page
+from posts.routers import (PIN_COOKIE, PrimaryReplicaRouter,
+                           ReadYourWritesMiddleware)
+
+REPLICA = 'replica'
+USERNAME = 'testuser'
+
+URL_FOR_INDEX = reverse('index')
+URL_FOR_NEW_POST = reverse('new_post')
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def read_alias(self, request):
+        middleware = ReadYourWritesMiddleware(
+            lambda request: HttpResponse(self.router.db_for_read(Post)),
+        )
+        return middleware(request).content.decode()
+
+    def test_reads_go_to_replicas_and_writes_to_primary(self):
+        """Чтение идёт с реплики, запись — в основную базу
+        """
+        self.assertEqual(self.router.db_for_read(Post), REPLICA)
+        self.assertEqual(self.router.db_for_write(Post), DEFAULT_DB_ALIAS)
+        self.assertFalse(self.router.allow_migrate(REPLICA, 'posts'))
+
+    def test_pinned_requests_read_from_primary(self):
+        """Запрос с меткой PIN_COOKIE читает с основной базы
+        """
+        factory = RequestFactory()
+        pinned = factory.get(URL_FOR_INDEX)
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.read_alias(pinned), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.read_alias(factory.get(URL_FOR_INDEX)), REPLICA)
+
+    def test_cached_pages_read_from_primary(self):
+        """Страница для кэша анонимных пользователей строится
+        по основной базе
+        """
+        cache.clear()
+        view = cache_anonymous_page(lambda: [])(
+            lambda request: HttpResponse(self.router.db_for_read(Post)),
+        )
+        request = RequestFactory().get(URL_FOR_INDEX)
+        request.user = AnonymousUser()
+        self.assertEqual(view(request).content.decode(), DEFAULT_DB_ALIAS)
+
+
+class ReadYourWritesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=USERNAME)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_write_sets_pin_cookie(self):
+        """Метку получает только запрос, который записал в базу
+        """
+        response = self.authorized_client.get(URL_FOR_NEW_POST)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        response = self.authorized_client.post(
+            URL_FOR_NEW_POST,
+            {'text': 'test text'},
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
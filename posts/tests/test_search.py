@@ -0,0 +1,107 @@
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.pagination import POSTS_PER_PAGE
+
+USERNAME = 'testuser'
+
+URL_FOR_SEARCH = reverse('search')
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=USERNAME, is_staff=True,
+                                       is_superuser=True)
+        cls.cat = Post.objects.create(
+            text='Кот спит на солнце',
+            author=cls.user,
+        )
+        cls.cats = Post.objects.create(
+            text='Коты, коты и ещё раз коты',
+            author=cls.user,
+        )
+        cls.dog = Post.objects.create(text='Собака гуляет', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def found(self, query, **params):
+        response = self.client.get(URL_FOR_SEARCH, {'q': query, **params})
+        return response, list(response.context['page'])
+
+    def test_results_are_ranked(self):
+        """Поиск находит посты по префиксу слова, самые релевантные
+        первыми, и выводит их карточками
+        """
+        response, posts = self.found('КОТ')
+        self.assertEqual(posts, [self.cats, self.cat])
+        self.assertContains(response, 'Кот спит на солнце')
+        self.assertNotContains(response, 'Собака гуляет')
+
+    def test_index_follows_edits_and_deletes(self):
+        """Правка и удаление поста обновляют индекс
+        """
+        self.dog.text = 'Кот вместо собаки'
+        self.dog.save()
+        self.assertIn(self.dog, self.found('кот')[1])
+        self.assertEqual(self.found('собака')[1], [])
+        Post.objects.filter(pk=self.cat.pk).delete()
+        self.assertNotIn(self.cat, self.found('кот')[1])
+
+    def test_query_syntax_is_ignored(self):
+        """Операторы FTS5 во вводе не ломают поиск
+        """
+        for query in ('"кот', 'кот OR', 'NEAR(', '*', ''):
+            with self.subTest(query=query):
+                response, _ = self.found(query)
+                self.assertEqual(response.status_code, 200)
+
+    def test_cursor_pagination(self):
+        """Курсоры проходят все результаты без повторов в обе стороны
+        """
+        Post.objects.bulk_create(
+            Post(text=f'кот номер {number}', author=self.user)
+            for number in range(POSTS_PER_PAGE * 2)
+        )
+        _, first = self.found('кот')
+        page = self.client.get(
+            URL_FOR_SEARCH, {'q': 'кот'},
+        ).context['page']
+        seen = list(page)
+        while page.next_cursor:
+            page = self.client.get(
+                URL_FOR_SEARCH,
+                {'q': 'кот', 'cursor': page.next_cursor},
+            ).context['page']
+            seen += page
+        self.assertEqual(len(seen), POSTS_PER_PAGE * 2 + 2)
+        self.assertEqual(len(set(seen)), len(seen))
+        previous = self.client.get(
+            URL_FOR_SEARCH,
+            {'q': 'кот', 'cursor': page.previous_cursor},
+        ).context['page']
+        self.assertEqual(list(previous), seen[-len(page) - POSTS_PER_PAGE:
+                                              -len(page)])
+        self.assertEqual(first, seen[:POSTS_PER_PAGE])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке находит посты через индекс
+        """
+        request = RequestFactory().get('/')
+        request.user = self.user
+        admin = site._registry[Post]
+        for query, expected in (('собак', {self.dog}),
+                                ('кот', {self.cat, self.cats})):
+            with self.subTest(query=query):
+                queryset, _ = admin.get_search_results(
+                    request,
+                    Post.objects.all(),
+                    query,
+                )
+                self.assertIn('posts_post_fts', str(queryset.query))
+                self.assertEqual(set(queryset), expected)
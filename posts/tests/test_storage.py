@@ -0,0 +1,146 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import counters, thumbnails
+from posts.models import Post, User
+from posts.storage import is_sharded
+
+USERNAME = 'testuser'
+
+URL_FOR_NEW_POST = reverse('new_post')
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def uploaded_image(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(
+        name='upload.png',
+        content=buffer.getvalue(),
+        content_type='image/png',
+    )
+
+
+def stored_files():
+    return [
+        os.path.join(root, name)
+        for root, _, names in os.walk(os.path.join(MEDIA_ROOT, 'posts'))
+        for name in names
+    ]
+
+
+def references(name):
+    return counters.get_count(
+        counters.image_key(name),
+        Post.objects.filter(image=name),
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, color):
+        self.authorized_client.post(
+            URL_FOR_NEW_POST,
+            {'text': 'test text', 'image': uploaded_image(color)},
+        )
+        return Post.objects.latest('id')
+
+    def test_duplicates_share_one_file(self):
+        """Одинаковые картинки хранятся одним файлом с именем по хэшу
+        """
+        first = self.upload('red')
+        second = self.upload('red')
+        other = self.upload('blue')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertTrue(is_sharded(first.image.name))
+        self.assertEqual(len(stored_files()), 2)
+        self.assertEqual(references(first.image.name), 2)
+
+    def test_references_follow_posts(self):
+        """Счётчик ссылок следует за созданием, правкой и удалением
+        """
+        post = self.upload('red')
+        name = post.image.name
+        references(name)
+        copy = Post.objects.create(
+            text='copy',
+            author=self.user,
+            image=name,
+        )
+        self.assertEqual(references(name), 2)
+        copy.image = None
+        copy.save()
+        self.assertEqual(references(name), 1)
+        post.delete()
+        self.assertEqual(references(name), 0)
+
+    def test_gc_removes_only_unreferenced_images(self):
+        """gc_images удаляет картинки без ссылок вместе с миниатюрами
+        """
+        kept = self.upload('red')
+        dropped = self.upload('blue')
+        thumbnails.generate(dropped.image.name)
+        thumbnail = thumbnails.for_post(dropped)
+        path = dropped.image.path
+        dropped.delete()
+
+        call_command('gc_images', grace=0, stdout=io.StringIO())
+
+        self.assertTrue(os.path.exists(kept.image.path))
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(thumbnail.exists())
+
+    def test_shard_images_moves_legacy_files(self):
+        """shard_images переносит старые картинки в подкаталоги по хэшу,
+        повторный запуск ничего не меняет
+        """
+        legacy = 'posts/legacy.png'
+        os.makedirs(os.path.join(MEDIA_ROOT, 'posts'), exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, legacy), 'wb') as file:
+            file.write(uploaded_image('green').read())
+        post = Post.objects.create(
+            text='legacy',
+            author=self.user,
+            image=legacy,
+        )
+
+        call_command('shard_images', stdout=io.StringIO())
+
+        post.refresh_from_db()
+        self.assertTrue(is_sharded(post.image.name))
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, legacy)))
+        self.assertEqual(references(post.image.name), 1)
+        self.assertEqual(references(legacy), 0)
+
+        name = post.image.name
+        call_command('shard_images', stdout=io.StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
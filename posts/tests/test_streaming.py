@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import cards, performance
+from posts.models import Follow, Group, Post, User
+from posts.performance import capture_requests
+
+USERNAME = 'testuser'
+AUTHOR_USERNAME = 'author'
+GROUP_SLUG = 'test-slug'
+POST_TEXT = 'streamed text'
+
+FEED_URLS = (
+    reverse('index'),
+    reverse('group', args=(GROUP_SLUG,)),
+    reverse('profile', args=(AUTHOR_USERNAME,)),
+    reverse('follow_index'),
+)
+
+
+class StreamingFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=USERNAME)
+        author = User.objects.create(username=AUTHOR_USERNAME)
+        group = Group.objects.create(
+            title='test title',
+            slug=GROUP_SLUG,
+            description='test description',
+        )
+        Follow.objects.create(user=cls.user, author=author)
+        cls.post = Post.objects.create(
+            text=POST_TEXT,
+            author=author,
+            group=group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feeds_stream_head_before_cards(self):
+        """Ленты отдаются по частям: сначала страница до карточек,
+        затем карточки; context и content доступны в тестах
+        """
+        for url in FEED_URLS:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertTrue(response.streaming)
+                self.assertEqual(response.context['page'][0], self.post)
+                head = next(iter(response.streaming_content)).decode()
+                self.assertIn('</nav>', head)
+                self.assertNotIn(POST_TEXT, head)
+                self.assertContains(response, POST_TEXT)
+                self.assertIn(POST_TEXT, response.content.decode())
+
+    def test_streamed_cards_are_measured(self):
+        """Рендеринг карточек при отдаче тела входит в измерение
+        запроса, итог сообщается после последней части
+        """
+        measured = []
+
+        def render_card(post):
+            measured.append(performance._current.get())
+            return original(post)
+
+        original = cards.render_card
+        with mock.patch('posts.cards.render_card', render_card), \
+                capture_requests() as captured:
+            response = self.authorized_client.get(FEED_URLS[0])
+            self.assertEqual(measured, [])
+            self.assertEqual(captured, [])
+            response.content
+        self.assertEqual(len(captured), 1)
+        self.assertEqual(captured[0].url_name, 'index')
+        self.assertEqual(measured, [captured[0]])
+
+    @override_settings(STREAM_FEEDS=False)
+    def test_streaming_can_be_disabled(self):
+        """STREAM_FEEDS=False возвращает обычный ответ
+        """
+        response = self.authorized_client.get(FEED_URLS[0])
+        self.assertFalse(response.streaming)
+        self.assertContains(response, POST_TEXT)
+
+    def test_anonymous_pages_are_cached_whole(self):
+        """Анонимная страница кэшируется целиком и отдаётся из кэша
+        """
+        first = Client().get(FEED_URLS[0])
+        self.assertFalse(first.streaming)
+        with self.assertNumQueries(0):
+            cached = Client().get(FEED_URLS[0])
+        self.assertEqual(cached.content, first.content)
@@ -0,0 +1,230 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails
+from posts.management.commands import generate_thumbnails
+from posts.models import Post, User
+
+USERNAME = 'testuser'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+PLACEHOLDER = 'card-img bg-light'
+IMAGE_POSTS_COUNT = 3
+
+URL_FOR_INDEX = reverse('index')
+URL_FOR_NEW_POST = reverse('new_post')
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def uploaded_gif():
+    return SimpleUploadedFile(
+        name='small.gif',
+        content=SMALL_GIF,
+        content_type='image/gif',
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+@mock.patch('posts.thumbnails._submit')
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        # TestCase не фиксирует транзакции, поэтому обработчики
+        # on_commit запускаются вручную
+        self.on_commit = []
+        patcher = mock.patch(
+            'posts.thumbnails.transaction.on_commit',
+            self.on_commit.append,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def commit(self):
+        while self.on_commit:
+            self.on_commit.pop(0)()
+
+    def test_upload_schedules_thumbnails(self, submit):
+        """Загрузка картинки ставит создание миниатюр в фоновый пул
+        """
+        self.authorized_client.post(
+            URL_FOR_NEW_POST,
+            {'text': 'test text', 'image': uploaded_gif()},
+        )
+        self.commit()
+        post = Post.objects.get()
+        self.assertTrue(post.image)
+        submit.assert_called_once_with([post.image.name])
+
+    def test_placeholder_until_thumbnail_is_ready(self, submit):
+        """Пока миниатюра не готова, карточка показывает заглушку,
+        после создания миниатюры карточка рендерится заново
+        """
+        post = Post.objects.create(
+            text='test text',
+            author=self.user,
+            image=uploaded_gif(),
+        )
+        response = self.authorized_client.get(URL_FOR_INDEX)
+        self.assertContains(response, PLACEHOLDER)
+        self.commit()
+        submit.assert_called_with([post.image.name])
+
+        thumbnails.generate(post.image.name)
+        response = self.authorized_client.get(URL_FOR_INDEX)
+        self.assertNotContains(response, PLACEHOLDER)
+        self.assertContains(
+            response,
+            thumbnails.for_post(Post.objects.get()).url,
+        )
+
+    def test_failed_images_are_not_rescheduled(self, submit):
+        """Картинка, миниатюры которой не удалось создать, не ставится
+        в пул при следующих показах
+        """
+        post = Post.objects.create(
+            text='test text',
+            author=self.user,
+            image=uploaded_gif(),
+        )
+        with mock.patch(
+            'posts.thumbnails.generate',
+            side_effect=ValueError,
+        ), self.assertLogs('posts.thumbnails', 'ERROR'):
+            thumbnails._work(post.image.name)
+        self.authorized_client.get(URL_FOR_INDEX)
+        self.commit()
+        submit.assert_not_called()
+
+    def test_page_thumbnails_are_read_in_one_query(self, submit):
+        """Миниатюры всех постов страницы читаются из KVStore одним
+        запросом
+        """
+        for number in range(IMAGE_POSTS_COUNT):
+            post = Post.objects.create(
+                text=f'test text {number}',
+                author=self.user,
+                image=uploaded_gif(),
+            )
+            thumbnails.generate(post.image.name)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(URL_FOR_INDEX)
+        kvstore_queries = [
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        self.assertNotContains(response, PLACEHOLDER)
+        submit.assert_not_called()
+
+    def test_command_prepares_responsive_variants(self, submit):
+        """Команда generate_thumbnails создаёт варианты карточки,
+        и карточка выводит их через <picture> и srcset
+        """
+        post = Post.objects.create(
+            text='test text',
+            author=self.user,
+            image=uploaded_gif(),
+        )
+        call_command('generate_thumbnails', stdout=StringIO())
+        post = Post.objects.get(pk=post.pk)
+        self.assertNotIn(None, [
+            thumbnails.for_post(post, size) for size in thumbnails.sizes()
+        ])
+        response = self.authorized_client.get(URL_FOR_INDEX)
+        webp = thumbnails.for_post(
+            post,
+            thumbnails.variant('WEBP', settings.CARD_IMAGE_WIDTHS[0]),
+        )
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, f'{webp.url} {webp.width}w')
+        self.assertTrue(webp.name.endswith('.webp'))
+
+    def test_command_skips_ready_images(self, submit):
+        """Повторный запуск generate_thumbnails пропускает картинки
+        с готовыми миниатюрами, а отсутствующие файлы только называет
+        """
+        Post.objects.create(
+            text='test text',
+            author=self.user,
+            image=uploaded_gif(),
+        )
+        Post.objects.create(
+            text='missing',
+            author=self.user,
+            image='posts/missing.gif',
+        )
+        call_command('generate_thumbnails', stdout=StringIO(),
+                     stderr=StringIO())
+        output = StringIO()
+        errors = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=output,
+                     stderr=errors)
+        self.assertIn('обработано 0, пропущено 1', output.getvalue())
+        self.assertIn('posts/missing.gif', errors.getvalue())
+
+    def test_command_continues_after_broken_image(self, submit):
+        """Испорченная картинка попадает в отчёт и не прерывает
+        обработку остальных
+        """
+        broken = Post.objects.create(
+            text='broken',
+            author=self.user,
+            image=SimpleUploadedFile('broken.gif', b'GIF89a broken'),
+        )
+        post = Post.objects.create(
+            text='test text',
+            author=self.user,
+            image=uploaded_gif(),
+        )
+        output = StringIO()
+        errors = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=output,
+                     stderr=errors)
+        self.assertIn(broken.image.name, errors.getvalue())
+        self.assertIn('обработано 1, пропущено 0, с ошибками 1',
+                      output.getvalue())
+        self.assertIsNotNone(thumbnails.for_post(Post.objects.get(
+            pk=post.pk,
+        )))
+        with mock.patch(
+            'posts.thumbnails.render',
+            side_effect=Image.DecompressionBombError('too big'),
+        ):
+            name, entry, error = generate_thumbnails.render(
+                post.image.name,
+                False,
+            )
+        self.assertIsNone(entry)
+        self.assertIn('DecompressionBombError', error)
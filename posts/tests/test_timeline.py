@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, User
+
+USERNAME = 'testuser'
+AUTHOR_USERNAME = 'author'
+POST_TEXT = 'test text'
+
+URL_FOR_FOLLOW = reverse('follow_index')
+URL_FOR_PROFILE_FOLLOW = reverse('profile_follow', args=(AUTHOR_USERNAME,))
+URL_FOR_PROFILE_UNFOLLOW = reverse(
+    'profile_unfollow',
+    args=(AUTHOR_USERNAME,)
+)
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+        cls.author = User.objects.create(username=AUTHOR_USERNAME)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новый пост попадает в материализованную ленту подписчика
+        """
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text=POST_TEXT, author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        response = self.authorized_client.get(URL_FOR_FOLLOW)
+        self.assertEqual(list(response.context['page']), [post])
+
+    def test_follow_backfills_and_unfollow_trims_timeline(self):
+        """Подписка заполняет ленту старыми постами, отписка очищает её
+        """
+        posts = [
+            Post.objects.create(text=POST_TEXT, author=self.author)
+            for _ in range(3)
+        ]
+        self.authorized_client.get(URL_FOR_PROFILE_FOLLOW)
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('post_id', flat=True)),
+            {post.id for post in posts},
+        )
+        self.authorized_client.get(URL_FOR_PROFILE_UNFOLLOW)
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_posts_are_merged_on_read(self):
+        """Посты автора с большим числом подписчиков добавляются
+        к ленте при чтении без записи в базу
+        """
+        other = User.objects.create(username='other')
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        Follow.objects.create(user=self.user, author=other)
+        fanned_out = Post.objects.create(text=POST_TEXT, author=other)
+        pulled = Post.objects.create(text=POST_TEXT, author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=pulled).exists())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(URL_FOR_FOLLOW)
+        self.assertEqual(
+            list(response.context['page']),
+            [pulled, fanned_out],
+        )
+        self.assertEqual(response.context['paginator'].count, 2)
+        self.assertFalse(any(
+            query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+            for query in queries
+        ))
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_pulled_posts_stay_after_author_leaves_pull_set(self):
+        """Посты, опубликованные, пока у автора было много подписчиков,
+        остаются в лентах после того, как подписчиков стало меньше
+        """
+        other = User.objects.create(username='other')
+        Follow.objects.create(user=self.user, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        pulled = Post.objects.create(text=POST_TEXT, author=self.author)
+        follow.delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=pulled).exists()
+        )
+        published = Post.objects.create(text=POST_TEXT, author=self.author)
+        response = self.authorized_client.get(URL_FOR_FOLLOW)
+        self.assertEqual(list(response.context['page']), [published, pulled])
+        self.assertEqual(response.context['paginator'].count, 2)
@@ -0,0 +1,130 @@
+import datetime as dt
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, User
+
+USERNAME = 'testuser'
+AUTHOR_USERNAME = 'author'
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class JsonlTransferTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.path = os.path.join(TEMP_DIR, f'{self._testMethodName}.jsonl')
+        user = User.objects.create(username=USERNAME)
+        author = User.objects.create(username=AUTHOR_USERNAME)
+        group = Group.objects.create(
+            title='test title',
+            slug='test-slug',
+            description='test description',
+        )
+        self.posts = [
+            Post.objects.create(text=f'text {number}', author=author,
+                                group=group)
+            for number in range(3)
+        ]
+        past = timezone.now() - dt.timedelta(days=30)
+        Post.objects.filter(pk=self.posts[0].pk).update(pub_date=past)
+        Comment.objects.create(post=self.posts[0], author=user, text='c')
+        Follow.objects.create(user=user, author=author)
+        call_command('export_jsonl', self.path, stdout=StringIO())
+        self.expected = self.snapshot()
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+
+    def snapshot(self):
+        return (
+            list(Group.objects.values_list('pk', 'slug')),
+            list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'pub_date', 'author__username', 'group_id',
+                'comment_count',
+            )),
+            list(Comment.objects.values_list('post_id', 'author__username')),
+            list(Follow.objects.values_list(
+                'user__username',
+                'author__username',
+            )),
+        )
+
+    def load(self, **options):
+        call_command('import_jsonl', self.path, stdout=StringIO(),
+                     **options)
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка сохраняют записи, ссылки и даты,
+        производные счётчики пересчитываются
+        """
+        self.load(batch_size=2)
+        self.assertEqual(self.snapshot(), self.expected)
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+    def test_import_resumes_from_checkpoint(self):
+        """Загрузка продолжается после строки из checkpoint,
+        повтор уже загруженных строк ничего не ломает
+        """
+        self.load()
+        Follow.objects.all().delete()
+        with open(f'{self.path}.checkpoint', 'w') as file:
+            json.dump({'line': 1}, file)
+        Group.objects.all().delete()
+        self.load()
+        self.assertFalse(Group.objects.exists())
+        self.assertTrue(Follow.objects.exists())
+
+    def test_invalid_line_is_reported(self):
+        """Неверная строка останавливает загрузку с её номером,
+        загруженные пачки остаются в checkpoint
+        """
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({
+                'model': 'post',
+                'pk': 100,
+                'fields': {'author': USERNAME, 'pub_date': 'вчера'},
+            }) + '\n')
+        lines = sum(1 for _ in open(self.path, encoding='utf-8'))
+        with self.assertRaisesMessage(CommandError, f'Строка {lines}'):
+            self.load(batch_size=1)
+        with open(f'{self.path}.checkpoint') as file:
+            self.assertEqual(json.load(file)['line'], lines - 1)
+
+    def test_import_into_filled_tables_is_refused(self):
+        """Новая загрузка в непустые таблицы отклоняется: pk из выгрузки
+        совпали бы с чужими записями
+        """
+        author = User.objects.create(username='other')
+        Post.objects.create(text='existing', author=author)
+        with self.assertRaisesMessage(CommandError, 'post'):
+            self.load()
+        self.assertEqual(Post.objects.get().text, 'existing')
+
+    def test_malformed_records_are_reported(self):
+        """Запись неверной формы останавливает загрузку с номером строки
+        """
+        records = (
+            [],
+            {'model': ['post'], 'pk': 1, 'fields': {}},
+            {'model': 'post', 'pk': 1, 'fields': 'text'},
+            {'model': 'post', 'pk': 1, 'fields': {'author': ['a']}},
+        )
+        for record in records:
+            with self.subTest(record=record):
+                with open(self.path, 'w', encoding='utf-8') as file:
+                    file.write(json.dumps(record) + '\n')
+                with self.assertRaisesMessage(CommandError, 'Строка 1'):
+                    self.load(restart=True)
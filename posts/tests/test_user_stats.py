@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, User, UserStats
+
+USERNAME = 'testuser'
+FOLLOWER_USERNAME = 'follower'
+POST_TEXT = 'test text'
+
+URL_FOR_PROFILE = reverse('profile', args=(USERNAME,))
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username=USERNAME)
+        cls.follower = User.objects.create(username=FOLLOWER_USERNAME)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_profile_stats_follow_write_paths(self):
+        """Статистика профиля обновляется при подписке, публикации
+        и комментировании
+        """
+        self.guest_client.get(URL_FOR_PROFILE)
+        Follow.objects.create(user=self.follower, author=self.user)
+        post = Post.objects.create(text=POST_TEXT, author=self.user)
+        Comment.objects.create(post=post, author=self.user, text='c')
+        stats = self.guest_client.get(URL_FOR_PROFILE).context['stats']
+        self.assertEqual(
+            (stats.followers, stats.following, stats.posts, stats.comments),
+            (1, 0, 1, 1),
+        )
+        Follow.objects.get().delete()
+        post.delete()
+        stats.refresh_from_db()
+        self.assertEqual(
+            (stats.followers, stats.posts, stats.comments),
+            (0, 0, 0),
+        )
+
+    def test_sidebar_renders_stats(self):
+        """Боковая панель выводит значения из UserStats
+        """
+        Post.objects.create(text=POST_TEXT, author=self.user)
+        response = self.guest_client.get(URL_FOR_PROFILE)
+        self.assertContains(response, 'Записей: 1')
+        self.assertContains(response, 'Подписчиков: 0')
+
+    def test_rebuild_user_stats(self):
+        """Команда rebuild_user_stats исправляет расхождения
+        """
+        Post.objects.create(text=POST_TEXT, author=self.user)
+        Post.objects.create(text=POST_TEXT, author=self.user)
+        Follow.objects.create(user=self.follower, author=self.user)
+        UserStats.objects.update_or_create(
+            user=self.user,
+            defaults={'posts': 10, 'followers': 10},
+        )
+        call_command('rebuild_user_stats', stdout=StringIO())
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.posts, stats.followers), (2, 1))
+        self.assertEqual(
+            UserStats.objects.get(user=self.follower).following,
+            1,
+        )
+
+    def test_missing_stats_are_not_created_on_read(self):
+        """Профиль без строки UserStats показывает точные значения,
+        но не создаёт строку при чтении
+        """
+        UserStats.objects.filter(user=self.user).delete()
+        Post.objects.create(text=POST_TEXT, author=self.user)
+        response = self.guest_client.get(URL_FOR_PROFILE)
+        self.assertEqual(response.context['stats'].posts, 1)
+        self.assertFalse(UserStats.objects.filter(user=self.user).exists())
+
+    def test_new_user_gets_stats(self):
+        """Строка UserStats создаётся вместе с пользователем
+        """
+        user = User.objects.create(username='newcomer')
+        stats = UserStats.objects.get(user=user)
+        self.assertEqual(
+            (stats.followers, stats.following, stats.posts, stats.comments),
+            (0, 0, 0, 0),
+        )
@@ -127,22 +127,26 @@ class PostsPagesTests(TestCase):
                 self.assertTrue(self.user == author)
 
     def test_index_cache(self):
-        """Кэширование страницы выполняется корректно
+        """Кэширование страницы выполняется корректно: страница берётся
+        из кэша, пока новая запись не сменит поколение ленты
         """
-        page_before = self.authorized_client.get(URL_FOR_INDEX)
+        cache.clear()
+        page_before = self.guest_client.get(URL_FOR_INDEX)
         content_before = page_before.content
+        # update() не отправляет сигналов и не сбрасывает кэш
+        Post.objects.filter(pk=self.post.pk).update(text='changed')
+        cache_page = self.guest_client.get(URL_FOR_INDEX)
+        cache_content = cache_page.content
         Post.objects.create(
             text='cache',
             author=self.user,
             group=self.group,
         )
-        cache_page = self.authorized_client.get(URL_FOR_INDEX)
-        cache_content = cache_page.content
-        cache.clear()
-        page_after = self.authorized_client.get(URL_FOR_INDEX)
+        page_after = self.guest_client.get(URL_FOR_INDEX)
         content_after = page_after.content
         self.assertTrue(content_before == cache_content)
         self.assertFalse(content_before == content_after)
+        self.assertIn('cache', page_after.context['page'][0].text)
 
     def test_subscription_works_correctly(self):
         """Новая запись пользователя появляется в ленте тех, кто на него
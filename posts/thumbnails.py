@@ -0,0 +1,379 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import deserialize, serialize
+from sorl.thumbnail.images import (ImageFile, deserialize_image_file,
+                                   serialize_image_file)
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import page_cache
+from .models import Post
+from .storage import mark_used
+
+logger = logging.getLogger(__name__)
+
+CARD = 'card'
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class Backend(ThumbnailBackend):
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """ImageFile будущей миниатюры: имя считается так же, как
+        в get_thumbnail, но без чтения исходника и без генерации.
+        """
+        source = ImageFile(file_)
+        options = self.thumbnail_options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def thumbnail_options(self, source, options):
+        """Опции миниатюры с умолчаниями, как в get_thumbnail."""
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    def get_many(self, image_files):
+        """get() для нескольких ImageFile: один get_many кэша и один
+        запрос к базе для промахов кэша.
+        """
+        keys = [add_prefix(image_file.key) for image_file in image_files]
+        if not keys:
+            return []
+        values = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            stored = dict(KVStoreModel.objects.filter(
+                key__in=missing,
+            ).values_list('key', 'value'))
+            # отсутствие записи тоже кэшируется, как в _get_raw
+            fetched = {
+                key: stored.get(key, cached_db_kvstore.EMPTY_VALUE)
+                for key in missing
+            }
+            self.cache.set_many(
+                fetched,
+                thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT,
+            )
+            values.update(fetched)
+        return [
+            None
+            if values[key] == cached_db_kvstore.EMPTY_VALUE
+            else deserialize_image_file(values[key])
+            for key in keys
+        ]
+
+    def set_many(self, entries):
+        """set() для пар (исходник, его миниатюры): списки миниатюр
+        исходников читаются одним запросом, все записи пишутся пачкой.
+        """
+        values = {}
+        lists = {}
+        for source_file, thumbnail_files in entries:
+            values[add_prefix(source_file.key)] = serialize_image_file(
+                source_file,
+            )
+            for thumbnail in thumbnail_files:
+                values[add_prefix(thumbnail.key)] = serialize_image_file(
+                    thumbnail,
+                )
+            lists.setdefault(
+                add_prefix(source_file.key, 'thumbnails'),
+                set(),
+            ).update(thumbnail.key for thumbnail in thumbnail_files)
+        if not values:
+            return
+        stored = KVStoreModel.objects.filter(
+            key__in=list(lists),
+        ).values_list('key', 'value')
+        for key, value in stored:
+            lists[key].update(deserialize(value))
+        values.update({
+            key: serialize(sorted(keys)) for key, keys in lists.items()
+        })
+        with transaction.atomic():
+            KVStoreModel.objects.filter(key__in=list(values)).delete()
+            KVStoreModel.objects.bulk_create(
+                KVStoreModel(key=key, value=value)
+                for key, value in values.items()
+            )
+        self.cache.set_many(
+            values,
+            thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT,
+        )
+
+    def delete_many(self, image_files):
+        """Удаляет записи ImageFile из базы и кэша одним запросом."""
+        keys = [add_prefix(image_file.key) for image_file in image_files]
+        if keys:
+            self._delete_raw(*keys)
+
+
+backend = Backend()
+
+
+def variant(image_format, width):
+    return f'{CARD}-{width}-{image_format.lower()}'
+
+
+def card_size():
+    """Ширина и высота карточки из геометрии POST_THUMBNAILS."""
+    geometry = settings.POST_THUMBNAILS[CARD][0]
+    return tuple(map(int, geometry.split('x')))
+
+
+def sizes():
+    """Все миниатюры картинки поста: POST_THUMBNAILS и адаптивные
+    варианты карточки шириной CARD_IMAGE_WIDTHS в форматах
+    CARD_IMAGE_FORMATS с теми же пропорциями, что у карточки.
+    """
+    result = dict(settings.POST_THUMBNAILS)
+    options = settings.POST_THUMBNAILS[CARD][1]
+    card_width, card_height = card_size()
+    for image_format in settings.CARD_IMAGE_FORMATS:
+        for width in settings.CARD_IMAGE_WIDTHS:
+            height = round(width * card_height / card_width)
+            # маленькие исходники не растягиваются: ширина варианта
+            # в srcset берётся из готового файла
+            result[variant(image_format, width)] = (
+                f'{width}x{height}',
+                {**options, 'format': image_format, 'upscale': False},
+            )
+    return result
+
+
+def source(name):
+    # имя миниатюры зависит от хранилища исходника
+    return ImageFile(name, Post._meta.get_field('image').storage)
+
+
+def render(name, force=False):
+    """Создаёт файлы всех миниатюр sizes() для картинки, не трогая
+    KVStore, и возвращает исходник и список миниатюр для set_many.
+
+    Исходник читается один раз на все размеры. Готовые файлы
+    пересоздаются только с force.
+    """
+    source_file = source(name)
+    source_image = None
+    thumbnail_files = []
+    try:
+        for geometry, options in sizes().values():
+            options = backend.thumbnail_options(source_file, options)
+            thumbnail = ImageFile(
+                backend._get_thumbnail_filename(
+                    source_file,
+                    geometry,
+                    options,
+                ),
+                default.storage,
+            )
+            if not force and thumbnail.exists():
+                thumbnail.set_size()
+            else:
+                if source_image is None:
+                    source_image = default.engine.get_image(source_file)
+                    source_file.set_size(
+                        default.engine.get_image_size(source_image),
+                    )
+                options['image_info'] = default.engine.get_image_info(
+                    source_image,
+                )
+                backend._create_thumbnail(
+                    source_image,
+                    geometry,
+                    options,
+                    thumbnail,
+                )
+                backend._create_alternative_resolutions(
+                    source_image,
+                    geometry,
+                    options,
+                    thumbnail.name,
+                )
+            thumbnail_files.append(thumbnail)
+    finally:
+        if source_image is not None:
+            default.engine.cleanup(source_image)
+    source_file.set_size()
+    return source_file, thumbnail_files
+
+
+def generate(name):
+    """Создаёт все миниатюры sizes() для картинки."""
+    default.kvstore.set_many([render(name)])
+
+
+def _refresh_pages(name):
+    # анонимные страницы с заглушкой вместо миниатюры устаревают
+    posts = Post.objects.filter(image=name).select_related('author', 'group')
+    page_cache.bump(
+        scope
+        for post in posts
+        for scope in page_cache.post_scopes(post)
+    )
+
+
+def _failed_key(name):
+    return f'thumbnails:failed:{name}'
+
+
+def _work(name):
+    try:
+        generate(name)
+        _refresh_pages(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры %s', name)
+        # испорченная картинка не ставится в пул при каждом показе
+        cache.set(_failed_key(name), True, settings.THUMBNAIL_RETRY_DELAY)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        # поток пула держит собственное соединение с базой
+        connection.close()
+
+
+def _submit(names):
+    global _executor
+    with _lock:
+        names = [name for name in names if name not in _pending]
+        _pending.update(names)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    for name in names:
+        _executor.submit(_work, name)
+
+
+def schedule(*images):
+    """Ставит создание миниатюр всех размеров POST_THUMBNAILS в фоновый
+    пул после фиксации транзакции, в которой сохранены картинки.
+
+    Имена файлов читаются в момент фиксации: до сохранения поста
+    хранилище ещё может переименовать файл. Картинки, миниатюры которых
+    не удалось создать, пропускаются THUMBNAIL_RETRY_DELAY секунд.
+    """
+    images = [image for image in images if image]
+
+    def submit():
+        keys = {_failed_key(image.name): image.name for image in images}
+        failed = cache.get_many(list(keys))
+        names = [name for key, name in keys.items() if key not in failed]
+        if names:
+            _submit(names)
+
+    if images:
+        transaction.on_commit(submit)
+
+
+def _touched_key(name):
+    return f'thumbnails:touched:{name}'
+
+
+def touch(posts):
+    """Отмечает использование миниатюр постов временем доступа к их
+    файлам: по нему evict_thumbnails вытесняет давно не нужные.
+
+    Файлы одной картинки трогаются не чаще раза в THUMBNAIL_TOUCH_INTERVAL
+    секунд, проверка идёт одним get_many на страницу.
+    """
+    keys = {_touched_key(post.image.name): post for post in posts}
+    touched = cache.get_many(list(keys))
+    stale = [post for key, post in keys.items() if key not in touched]
+    for post in stale:
+        for thumbnail in post._thumbnails.values():
+            if thumbnail is None:
+                continue
+            try:
+                mark_used(default.storage.path(thumbnail.name))
+            except (OSError, NotImplementedError):
+                pass
+    cache.set_many(
+        {_touched_key(post.image.name): True for post in stale},
+        settings.THUMBNAIL_TOUCH_INTERVAL,
+    )
+
+
+def prefetch(posts):
+    """Находит готовые миниатюры всех размеров для картинок всех постов
+    страницы одним запросом к KVStore и запоминает их на экземплярах.
+
+    Миниатюры не создаются на месте: картинки, у которых не хватает
+    миниатюр, ставятся в фоновый пул, а шаблон показывает заглушку.
+    """
+    all_sizes = sizes()
+    posts = [
+        post for post in posts
+        if post.image and '_thumbnails' not in post.__dict__
+    ]
+    files = [
+        backend.thumbnail_file(post.image, geometry, **options)
+        for post in posts
+        for geometry, options in all_sizes.values()
+    ]
+    found = iter(default.kvstore.get_many(files))
+    for post in posts:
+        post._thumbnails = {size: next(found) for size in all_sizes}
+    touch(posts)
+    schedule(*(
+        post.image
+        for post in posts
+        if None in post._thumbnails.values()
+    ))
+
+
+def for_post(post, size=CARD):
+    """Готовая миниатюра картинки поста или None."""
+    if not post.image:
+        return None
+    prefetch([post])
+    return post._thumbnails[size]
+
+
+def ready(post):
+    """Имена готовых миниатюр картинки поста."""
+    if not post.image:
+        return []
+    prefetch([post])
+    return sorted(
+        thumbnail.name
+        for thumbnail in post._thumbnails.values()
+        if thumbnail is not None
+    )
+
+
+def srcset(post, image_format):
+    """srcset из готовых вариантов картинки поста в формате."""
+    if image_format not in settings.CARD_IMAGE_FORMATS:
+        return ''
+    candidates = {}
+    for width in settings.CARD_IMAGE_WIDTHS:
+        thumbnail = for_post(post, variant(image_format, width))
+        if thumbnail is not None:
+            candidates.setdefault(thumbnail.width, thumbnail.url)
+    return ', '.join(
+        f'{url} {width}w' for width, url in sorted(candidates.items())
+    )
@@ -0,0 +1,151 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from . import counters
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+PULL_AUTHORS_KEY = 'timeline:pull_authors'
+PULL_AUTHORS_TIMEOUT = 300
+
+
+def _bulk_insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def _entries_for(user_id, posts):
+    for post_id, author_id, pub_date in posts.values_list(
+        'id', 'author_id', 'pub_date'
+    ).iterator():
+        yield TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+
+
+def pull_authors():
+    """Авторы, чьи посты не раскладываются по лентам при записи.
+
+    У таких авторов слишком много подписчиков, поэтому их посты
+    добавляются к ленте читателя при чтении, см. feed().
+    """
+    authors = cache.get(PULL_AUTHORS_KEY)
+    if authors is None:
+        authors = frozenset(
+            Follow.objects.values('author_id').annotate(
+                followers=Count('id'),
+            ).filter(
+                followers__gt=settings.TIMELINE_FANOUT_LIMIT,
+            ).values_list('author_id', flat=True)
+        )
+        cache.set(PULL_AUTHORS_KEY, authors, PULL_AUTHORS_TIMEOUT)
+    return authors
+
+
+def fan_out(post):
+    if post.author_id in pull_authors():
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id,
+    ).values_list('user_id', flat=True).iterator()
+    while True:
+        batch = list(islice(followers, BATCH_SIZE))
+        if not batch:
+            return
+        # пост мог уже попасть в ленту через backfill новой подписки;
+        # такие записи пропускаются и не сдвигают счётчики
+        existing = set(TimelineEntry.objects.filter(
+            post_id=post.id,
+            user_id__in=batch,
+        ).values_list('user_id', flat=True))
+        batch = [user_id for user_id in batch if user_id not in existing]
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post.id,
+                    author_id=post.author_id,
+                    pub_date=post.pub_date,
+                )
+                for user_id in batch
+            ],
+            ignore_conflicts=True,
+        )
+        counters.increment(
+            [counters.timeline_key(user_id) for user_id in batch]
+        )
+
+
+def backfill(follow):
+    _bulk_insert(_entries_for(
+        follow.user_id,
+        Post.objects.filter(author_id=follow.author_id),
+    ))
+    counters.invalidate([counters.timeline_key(follow.user_id)])
+
+
+def trim(follow):
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id,
+        author_id=follow.author_id,
+    ).delete()
+    counters.invalidate([counters.timeline_key(follow.user_id)])
+    if follow.author_id in pull_authors():
+        restore_fan_out(follow.author_id)
+
+
+def restore_fan_out(author_id):
+    """Раскладывает посты автора по лентам подписчиков, если у него
+    больше не слишком много подписчиков.
+
+    feed() перестаёт добавлять посты такого автора при чтении, а посты,
+    опубликованные, пока он был в pull_authors(), в ленты не записаны.
+    """
+    follows = Follow.objects.filter(author_id=author_id)
+    if follows.count() > settings.TIMELINE_FANOUT_LIMIT:
+        return
+    # новые посты автора снова раскладываются при записи
+    cache.delete(PULL_AUTHORS_KEY)
+    for follow in follows.iterator():
+        backfill(follow)
+
+
+def rebuild(user):
+    TimelineEntry.objects.filter(user=user).delete()
+    _bulk_insert(_entries_for(
+        user.id,
+        Post.objects.filter(author__following__user=user),
+    ))
+    counters.invalidate([counters.timeline_key(user.id)])
+
+
+def feed(user):
+    """Лента подписок пользователя.
+
+    Обычно это записи TimelineEntry в порядке (pub_date, post). Если
+    пользователь подписан на авторов из pull_authors(), лента читается
+    из постов: материализованные записи объединяются с постами этих
+    авторов в одном запросе, и чтение ничего не пишет в базу.
+    """
+    entries = TimelineEntry.objects.filter(user=user)
+    authors = pull_authors()
+    if authors:
+        authors = list(Follow.objects.filter(
+            user=user,
+            author_id__in=authors,
+        ).values_list('author_id', flat=True))
+    if not authors:
+        return entries.select_related('post__author', 'post__group')
+    return Post.objects.filter(
+        Q(id__in=entries.values('post_id')) | Q(author_id__in=authors),
+    ).select_related('author', 'group')
@@ -0,0 +1,127 @@
+"""Формат JSONL для команд export_jsonl и import_jsonl.
+
+Одна строка — одна запись ``{"model": "post", "pk": 1, "fields": {...}}``.
+Модели идут в порядке MODELS, чтобы ссылки указывали на уже
+загруженные записи. Пользователи указываются по username, остальные
+ссылки — по pk.
+"""
+import datetime as dt
+from contextlib import contextmanager
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post
+
+# модель -> (класс, {поле записи: путь для values()})
+MODELS = {
+    'group': (Group, {
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+    }),
+    'post': (Post, {
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group_id',
+        'image': 'image',
+        'image_width': 'image_width',
+        'image_height': 'image_height',
+        'image_placeholder': 'image_placeholder',
+    }),
+    'comment': (Comment, {
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+    'follow': (Follow, {
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+}
+USER_FIELDS = ('author', 'user')
+DATE_FIELDS = ('pub_date', 'created')
+
+
+@contextmanager
+def keep_dates():
+    """Отключает auto_now_add, чтобы bulk_create сохранил заданные
+    даты, а не текущее время.
+    """
+    fields = [
+        model._meta.get_field(name)
+        for model, paths in MODELS.values()
+        for name in paths
+        if name in DATE_FIELDS
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Encoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder отбрасывает микросекунды, а по дате
+        # с id строятся курсоры лент
+        if isinstance(o, dt.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def validate(record):
+    """Проверяет форму записи до обращений к базе, ошибки поднимают
+    ValueError. Значения полей проверяет build().
+    """
+    if not isinstance(record, dict):
+        raise ValueError('запись должна быть объектом')
+    model = record.get('model')
+    if not isinstance(model, str) or model not in MODELS:
+        raise ValueError(f'неизвестная модель {model!r}')
+    if not isinstance(record.get('pk'), int):
+        raise ValueError('pk должен быть целым числом')
+    if not isinstance(record.get('fields'), dict):
+        raise ValueError('fields должен быть объектом')
+    for name in usernames(record):
+        if not isinstance(name, str):
+            raise ValueError(f'неверное имя пользователя {name!r}')
+
+
+def usernames(record):
+    fields = record['fields']
+    return [fields[name] for name in USER_FIELDS if name in fields]
+
+
+def build(record, user_ids):
+    """Экземпляр модели из записи без обращений к базе.
+
+    Ссылки на пользователей переводятся в id по ``user_ids``, поля
+    проверяются clean_fields; ошибки поднимают ValidationError,
+    KeyError или ValueError.
+    """
+    model, paths = MODELS[record['model']]
+    fields = record['fields']
+    values = {'pk': record['pk']}
+    relations = []
+    for name in paths:
+        field = model._meta.get_field(name)
+        value = fields.get(name, field.get_default())
+        if name in USER_FIELDS:
+            values[field.attname] = user_ids[value]
+        elif name in DATE_FIELDS:
+            values[name] = parse_datetime(value)
+            if values[name] is None:
+                raise ValueError(f'{name}: неверная дата {value!r}')
+        else:
+            values[field.attname] = value
+        if field.is_relation:
+            relations.append(name)
+    instance = model(**values)
+    # ссылки проверит база, clean_fields проверял бы их запросами
+    instance.clean_fields(exclude=relations)
+    return instance
@@ -15,6 +15,9 @@ urlpatterns = [
     path('new/',
          views.new_post,
          name='new_post'),
+    path('search/',
+         views.search,
+         name='search'),
     path('<str:username>/',
          views.profile,
          name='profile'),
@@ -1,17 +1,24 @@
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
-from django.core.paginator import Paginator
 
+from . import counters, timeline
 from .forms import PostForm, CommentsForm
-from .models import Group, Post, User, Follow
+from .models import Group, Post, User, Follow, TimelineEntry
+from .page_cache import (FEED, author_scope, cache_anonymous_page,
+                         group_scope)
+from .pagination import paginate
+from .routers import pin_reads_after_write
+from .search import search as search_posts
+from .stats import get_stats
+from .streaming import render_feed
 
 
+@cache_anonymous_page(lambda: [FEED])
 def index(request):
-    post_list = Post.objects.select_related('group').all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
+    post_list = Post.objects.select_related('author', 'group').all()
+    paginator, page = paginate(request, post_list, count_key=counters.POSTS)
+    return render_feed(
         request,
         'index.html',
         {
@@ -21,13 +28,16 @@ def index(request):
     )
 
 
+@cache_anonymous_page(lambda slug: [group_scope(slug)])
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
+    posts = group.posts.select_related('author', 'group')
+    paginator, page = paginate(
+        request,
+        posts,
+        count_key=counters.group_key(group.id),
+    )
+    return render_feed(
         request,
         'group.html',
         {
@@ -38,39 +48,52 @@ def group_posts(request, slug):
     )
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page = search_posts(query, request.GET.get('cursor'))
+    return render(
+        request,
+        'search.html',
+        {
+            'query': query,
+            'page': page,
+        }
+    )
+
+
 @login_required
+@pin_reads_after_write
 def new_post(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
         return render(request, 'new.html', {'form': form})
-    new_post = form.save(commit=False)
-    new_post.author = request.user
-    new_post.save()
+    form.save_image()
+    with transaction.atomic():
+        new_post = form.save(commit=False)
+        new_post.author = request.user
+        new_post.save()
     return redirect('index')
 
 
+@cache_anonymous_page(lambda username: [author_scope(username)])
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    followers = Follow.objects.filter(author=author).count()
-    following = Follow.objects.filter(user=author).count()
+    stats = get_stats(author)
     follow = Follow.objects.filter(
         user=request.user.id,
         author=author.id
         ).exists()
-    posts = author.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = author.posts.select_related('author', 'group')
+    paginator, page = paginate(request, posts, count=stats.posts)
 
-    return render(
+    return render_feed(
         request,
         'profile.html',
         {
             'page': page,
             'author': author,
             'paginator': paginator,
-            'followers': followers,
-            'following': following,
+            'stats': stats,
             'follow': follow,
         }
     )
@@ -78,12 +101,12 @@ def profile(request, username):
 
 def post_view(request, username, post_id):
     post = get_object_or_404(
-        Post,
+        Post.objects.select_related('author', 'group'),
         id=post_id,
         author__username=username,
     )
     author = post.author
-    comments = post.comments.all()
+    comments = post.comments.select_related('author')
     form = CommentsForm()
     return render(
         request,
@@ -91,6 +114,7 @@ def post_view(request, username, post_id):
         {
             'post': post,
             'author': author,
+            'stats': get_stats(author),
             'form': form,
             'comments': comments,
         }
@@ -98,6 +122,7 @@ def post_view(request, username, post_id):
 
 
 @login_required
+@pin_reads_after_write
 def post_edit(request, username, post_id):
     author = get_object_or_404(User, username=username)
     if not request.user.username == username:
@@ -114,7 +139,9 @@ def post_edit(request, username, post_id):
     )
     if not form.is_valid():
         return render(request, 'new.html', {'form': form, 'post': post})
-    form.save()
+    form.save_image()
+    with transaction.atomic():
+        form.save()
     return redirect('post', author.username, post_id)
 
 
@@ -132,6 +159,7 @@ def server_error(request):
 
 
 @login_required
+@pin_reads_after_write
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
     form = CommentsForm(request.POST)
@@ -147,17 +175,27 @@ def add_comment(request, username, post_id):
     comment = form.save(commit=False)
     comment.author = request.user
     comment.post = post
-    comment.save()
+    with transaction.atomic():
+        comment.save()
     return redirect('post', username, post_id)
 
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user.id)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
+    entries = timeline.feed(request.user)
+    if entries.model is TimelineEntry:
+        paginator, page = paginate(
+            request,
+            entries,
+            keys=('pub_date', 'post_id'),
+            count_key=counters.timeline_key(request.user.id),
+        )
+        page.object_list = [entry.post for entry in page]
+    else:
+        # лента с постами популярных авторов собирается при чтении,
+        # счётчика для неё нет
+        paginator, page = paginate(request, entries)
+    return render_feed(
         request,
         'follow.html',
         {
@@ -168,22 +206,26 @@ def follow_index(request):
 
 
 @login_required
+@pin_reads_after_write
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user.username != username:
-        Follow.objects.get_or_create(
-            user_id=request.user.id,
-            author_id=author.id,
-        )
+        with transaction.atomic():
+            Follow.objects.get_or_create(
+                user_id=request.user.id,
+                author_id=author.id,
+            )
     return redirect('profile', username)
 
 
 @login_required
+@pin_reads_after_write
 def profile_unfollow(request, username):
     follow = get_object_or_404(
         Follow,
         author__username=username,
         user=request.user
     )
-    follow.delete()
+    with transaction.atomic():
+        follow.delete()
     return redirect('profile', username=username)
@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+
+import pytest
+
+from posts.performance import capture_requests
+
+
+@pytest.fixture
+def view_budget():
+    """Проверяет, что запросы внутри блока укладываются в бюджеты
+    SQL-запросов settings.VIEW_BUDGETS. Превышения времени только
+    пишутся в лог posts.performance.
+
+        with view_budget():
+            client.get('/')
+    """
+    @contextmanager
+    def check():
+        with capture_requests() as captured:
+            yield captured
+        problems = [
+            problem
+            for metrics in captured
+            for problem in metrics.violations(timing=False)
+        ]
+        assert not problems, '\n'.join(problems)
+    return check
@@ -0,0 +1,22 @@
+import pytest
+
+
+class TestViewBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_pages_within_budget(self, user_client, post_with_group, view_budget):
+        urls = (
+            '/',
+            f'/group/{post_with_group.group.slug}/',
+            f'/{post_with_group.author.username}/',
+            f'/{post_with_group.author.username}/{post_with_group.id}/',
+            '/follow/',
+        )
+        with view_budget() as captured:
+            for url in urls:
+                response = user_client.get(url)
+                assert response.status_code == 200, f'Страница `{url}` не открывается'
+                if response.streaming:
+                    b''.join(response.streaming_content)
+        assert len(captured) == len(urls), \
+            'Проверьте, что PerformanceMiddleware подключен в MIDDLEWARE'
@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
+from django.core.exceptions import ValidationError
+from django.urls import Resolver404, resolve, reverse
 
 User = get_user_model()
 
@@ -8,3 +10,17 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+    def clean_username(self):
+        """Отклоняет имена, под которыми профиль или посты открывали бы
+        другие страницы сайта, например media/.
+        """
+        username = self.cleaned_data['username']
+        for name, args in (('profile', ()), ('post', (1,))):
+            try:
+                match = resolve(reverse(name, args=(username, *args)))
+            except Resolver404:
+                continue
+            if match.url_name != name:
+                raise ValidationError('Это имя занято адресом сайта')
+        return username
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'posts.middleware.PerformanceMiddleware',
+    'posts.routers.ReadYourWritesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,7 +67,7 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'posts.performance.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -86,13 +88,28 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# yatube.sqlite3 включает WAL и PRAGMA из yatube/sqlite3/base.py,
+# их можно переопределить в OPTIONS['pragmas']. Соединение живёт
+# CONN_MAX_AGE секунд и переиспользуется следующими запросами потока
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Чтение идёт с реплик DATABASE_REPLICAS, запись — в default
+# (posts/routers.py). Реплика — ещё один алиас в DATABASES с
+# 'TEST': {'MIRROR': 'default'}; файл реплики SQLite обновляет команда
+# sync_replica. После записи чтение пользователя
+# READ_YOUR_WRITES_SECONDS секунд идёт с default
+
+DATABASE_ROUTERS = ['posts.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = []
+READ_YOUR_WRITES_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -145,10 +162,102 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Медиафайлы отдаёт posts.media.serve. Если задан префикс внутренней
+# location nginx, ответ передаётся через X-Accel-Redirect, при
+# MEDIA_SENDFILE через X-Sendfile (Apache, lighttpd); байты файла
+# тогда не проходят через Django
+
+MEDIA_ACCEL_REDIRECT = None
+MEDIA_SENDFILE = False
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 30
+
 # Идентификатор текущего сайта
 
 SITE_ID = 1
 
+# Авторы, у которых подписчиков больше этого числа, не раскладывают посты
+# по лентам подписчиков: /follow/ добавляет их посты к ленте при чтении.
+# Когда подписчиков становится не больше лимита, посты автора
+# раскладываются по лентам при отписке
+
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Время жизни анонимных страниц лент в кэше. Устаревшие страницы
+# отсекаются поколениями (posts/page_cache.py), а не этим сроком
+
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Время жизни отрендеренных карточек постов. Ключ карточки содержит
+# версию её данных, поэтому срок ограничивает только объём кэша
+
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Ленты отдаются по частям (posts/streaming.py): начало страницы
+# уходит до рендеринга карточек постов
+
+STREAM_FEEDS = True
+
+# Загруженные картинки постов пережимаются (posts/images.py): большая
+# сторона не больше UPLOAD_IMAGE_MAX_SIZE, качество JPEG
+# UPLOAD_IMAGE_QUALITY, метаданные удаляются
+
+UPLOAD_IMAGE_MAX_SIZE = 2560
+UPLOAD_IMAGE_QUALITY = 85
+
+# Заглушка карточки: копия картинки шириной IMAGE_PLACEHOLDER_WIDTH
+# в пропорциях карточки, встроенная в страницу как data URI
+
+IMAGE_PLACEHOLDER_WIDTH = 24
+IMAGE_PLACEHOLDER_QUALITY = 60
+
+# Миниатюры картинок постов: размер -> (геометрия, опции sorl-thumbnail).
+# Создаются в фоновом пуле из THUMBNAIL_WORKERS потоков сразу после
+# загрузки картинки (posts/thumbnails.py)
+
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+THUMBNAIL_WORKERS = 2
+# после ошибки картинка не ставится в пул снова столько секунд
+THUMBNAIL_RETRY_DELAY = 60 * 60
+
+# Каталог миниатюр media/cache ограничен THUMBNAIL_CACHE_MAX_BYTES:
+# команда evict_thumbnails удаляет давно не показанные миниатюры.
+# Показ отмечается не чаще раза в THUMBNAIL_TOUCH_INTERVAL секунд
+
+THUMBNAIL_CACHE_MAX_BYTES = 2 * 1024 ** 3
+THUMBNAIL_TOUCH_INTERVAL = 60 * 60 * 24
+
+# Адаптивные варианты картинки карточки для srcset: ширины и форматы.
+# Создаются вместе с остальными миниатюрами и командой
+# generate_thumbnails
+
+CARD_IMAGE_WIDTHS = (320, 640, 960, 1920)
+CARD_IMAGE_FORMATS = ('WEBP', 'JPEG')
+
+# Хранилище sorl-thumbnail с пакетным get_many для страниц лент
+THUMBNAIL_KVSTORE = 'posts.thumbnails.KVStore'
+
+# Бюджеты view по имени URL: число SQL-запросов и полное время ответа
+# в миллисекундах. PerformanceMiddleware пишет превышения в лог
+# posts.performance, тесты (posts/tests/test_budgets.py и фикстура
+# view_budget в tests/) падают на них. У потоковых лент в бюджет входит
+# и рендеринг карточек при отдаче тела, итог известен после его конца
+
+VIEW_BUDGETS = {
+    'index': {'queries': 7, 'time': 300},
+    'group': {'queries': 8, 'time': 300},
+    'profile': {'queries': 9, 'time': 300},
+    'post': {'queries': 10, 'time': 300},
+    'follow_index': {'queries': 9, 'time': 300},
+    'search': {'queries': 6, 'time': 300},
+    'new_post': {'queries': 15, 'time': 300},
+    'post_edit': {'queries': 16, 'time': 300},
+    'add_comment': {'queries': 11, 'time': 300},
+    'profile_follow': {'queries': 17, 'time': 300},
+    'profile_unfollow': {'queries': 13, 'time': 300},
+}
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -0,0 +1,45 @@
+"""Бэкенд SQLite для рабочего сервера.
+
+Каждое новое соединение включает WAL и настраивает PRAGMA из
+OPTIONS['pragmas'] поверх PRAGMAS. В режиме WAL читатели видят
+последнюю зафиксированную версию и не ждут пишущих, а пишущие не ждут
+читателей. Транзакции atomic начинаются с BEGIN IMMEDIATE: блокировка
+записи берётся сразу и ожидается busy_timeout, а не отказывает
+посреди транзакции при попытке чтения перейти в запись. Поэтому
+atomic во view охватывает только запись в базу, а не рендер формы
+или обработку картинки.
+"""
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    'journal_mode': 'wal',
+    # в режиме WAL NORMAL не теряет целостность при сбое, только
+    # последние транзакции при отключении питания
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def pragmas(self):
+        return {
+            **PRAGMAS,
+            **self.settings_dict['OPTIONS'].get('pragmas', {}),
+        }
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas().items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -5,6 +5,8 @@ from django.contrib import admin
 from django.contrib.flatpages import views
 from django.urls import include, path
 
+from posts import media
+
 urlpatterns = [
     path('auth/',
          include('users.urls')),
@@ -38,6 +40,9 @@ urlpatterns = [
          views.flatpage,
          {'url': '/terms/'},
          name='terms'),
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>',
+         media.serve,
+         name='media'),
     path("",
          include('posts.urls')),
 ]
@@ -46,10 +51,6 @@ handler404 = 'posts.views.page_not_found' #noqa
 handler500 = 'posts.views.server_error' #noqa
 
 if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
     urlpatterns += static(
         settings.STATIC_URL,
         document_root=settings.STATIC_ROOT